@@ -6,7 +6,10 @@ This script reads the failed normalization files from each dataset and reports
 the count of failed CURIEs by prefix for comparison across data sources.
 """
 
+import csv
 import logging
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from collections import defaultdict, Counter
 from typing import Dict, Tuple
@@ -16,36 +19,31 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
-def extract_prefix(curie: str) -> str:
-    """Extract the prefix from a CURIE (everything before the colon)."""
-    if ':' in curie:
-        return curie.split(':', 1)[0]
-    else:
-        # Handle cases where there's no colon (shouldn't happen in proper CURIEs)
-        return 'NO_PREFIX'
-
-
 def analyze_failed_file(file_path: Path) -> Dict[str, int]:
     """Analyze a single failed normalizations file and return prefix counts."""
     if not file_path.exists():
         logger.warning(f"Failed normalization file does not exist: {file_path}")
         return {}
     
-    prefix_counts = defaultdict(int)
-    total_lines = 0
-    
     logger.info(f"Analyzing {file_path}")
     
-    with open(file_path, 'r') as f:
-        for line in f:
-            curie = line.strip()
-            if curie:  # Skip empty lines
-                prefix = extract_prefix(curie)
-                prefix_counts[prefix] += 1
-                total_lines += 1
+    # One CURIE per line; \x01 never occurs in a CURIE so each line lands in a single column
+    try:
+        curies = pd.read_csv(file_path, header=None, names=['curie'], sep='\x01', dtype=str,
+                             quoting=csv.QUOTE_NONE, keep_default_na=False)['curie']
+    except pd.errors.EmptyDataError:
+        curies = pd.Series([], dtype=str)
+    
+    curies = curies.str.strip()
+    curies = curies[curies != '']  # Skip empty lines
+    
+    parts = curies.str.split(':', n=1)
+    prefixes = parts.str[0].where(parts.str.len() > 1, 'NO_PREFIX')
+    prefix_counts = prefixes.value_counts(sort=False)
+    total_lines = len(curies)
     
     logger.info(f"  Found {total_lines:,} failed CURIEs with {len(prefix_counts)} unique prefixes")
-    return dict(prefix_counts)
+    return {prefix: int(count) for prefix, count in prefix_counts.items()}
 
 
 def analyze_all_datasets() -> Dict[str, Dict[str, int]]:
@@ -59,35 +57,38 @@ def analyze_all_datasets() -> Dict[str, Dict[str, int]]:
         'OmniCorp': Path('../../cleaned/omnicorp/omnicorp_failed_normalizations.txt')
     }
     
-    results = {}
-    
-    for dataset_name, file_path in failed_files.items():
-        logger.info(f"\n=== Analyzing {dataset_name} ===")
-        results[dataset_name] = analyze_failed_file(file_path)
+    # Each file is independent, so parse all three in parallel
+    logger.info(f"Analyzing {', '.join(failed_files)} in parallel")
+    with ProcessPoolExecutor(max_workers=len(failed_files)) as executor:
+        prefix_counts = executor.map(analyze_failed_file, failed_files.values())
+        results = dict(zip(failed_files, prefix_counts))
     
     return results
 
 
 def print_summary_report(results: Dict[str, Dict[str, int]]):
     """Print a comprehensive summary report of failed normalizations."""
-    print("\n" + "="*80)
-    print("FAILED NORMALIZATION ANALYSIS REPORT")
-    print("="*80)
+    # Build the whole report first and emit it with a single write
+    lines = []
+    lines.append("\n" + "="*80)
+    lines.append("FAILED NORMALIZATION ANALYSIS REPORT")
+    lines.append("="*80)
     
     # Overall statistics
-    print("\n📊 OVERALL STATISTICS:")
-    print("-" * 40)
+    lines.append("\n📊 OVERALL STATISTICS:")
+    lines.append("-" * 40)
+    dataset_totals = {dataset: sum(prefix_counts.values()) for dataset, prefix_counts in results.items()}
     for dataset, prefix_counts in results.items():
-        total_failed = sum(prefix_counts.values())
+        total_failed = dataset_totals[dataset]
         unique_prefixes = len(prefix_counts)
-        print(f"{dataset:>12}: {total_failed:>10,} failed CURIEs, {unique_prefixes:>3} unique prefixes")
+        lines.append(f"{dataset:>12}: {total_failed:>10,} failed CURIEs, {unique_prefixes:>3} unique prefixes")
     
     # Collect all unique prefixes across datasets
     all_prefixes = set()
     for prefix_counts in results.values():
         all_prefixes.update(prefix_counts.keys())
     
-    print(f"\n🏷️  UNIQUE PREFIXES ACROSS ALL DATASETS: {len(all_prefixes)}")
+    lines.append(f"\n🏷️  UNIQUE PREFIXES ACROSS ALL DATASETS: {len(all_prefixes)}")
     
     # Sort prefixes by total failures across all datasets
     prefix_totals = defaultdict(int)
@@ -97,28 +98,28 @@ def print_summary_report(results: Dict[str, Dict[str, int]]):
     
     sorted_prefixes = sorted(prefix_totals.items(), key=lambda x: x[1], reverse=True)
     
-    print("\n📋 FAILED NORMALIZATIONS BY PREFIX (sorted by total failures):")
-    print("-" * 80)
-    print(f"{'Prefix':<20} {'NGD':>12} {'PubTator':>12} {'OmniCorp':>12} {'Total':>12}")
-    print("-" * 80)
+    lines.append("\n📋 FAILED NORMALIZATIONS BY PREFIX (sorted by total failures):")
+    lines.append("-" * 80)
+    lines.append(f"{'Prefix':<20} {'NGD':>12} {'PubTator':>12} {'OmniCorp':>12} {'Total':>12}")
+    lines.append("-" * 80)
     
     for prefix, total_count in sorted_prefixes:
         ngd_count = results.get('NGD', {}).get(prefix, 0)
         pubtator_count = results.get('PubTator', {}).get(prefix, 0)
         omnicorp_count = results.get('OmniCorp', {}).get(prefix, 0)
         
-        print(f"{prefix:<20} {ngd_count:>12,} {pubtator_count:>12,} {omnicorp_count:>12,} {total_count:>12,}")
+        lines.append(f"{prefix:<20} {ngd_count:>12,} {pubtator_count:>12,} {omnicorp_count:>12,} {total_count:>12,}")
     
     # Dataset-specific top failures
-    print("\n🎯 TOP 10 FAILED PREFIXES BY DATASET:")
-    print("-" * 60)
+    lines.append("\n🎯 TOP 10 FAILED PREFIXES BY DATASET:")
+    lines.append("-" * 60)
     
     for dataset, prefix_counts in results.items():
-        print(f"\n{dataset}:")
+        lines.append(f"\n{dataset}:")
         top_prefixes = sorted(prefix_counts.items(), key=lambda x: x[1], reverse=True)[:10]
         for i, (prefix, count) in enumerate(top_prefixes, 1):
-            percentage = (count / sum(prefix_counts.values())) * 100
-            print(f"  {i:>2}. {prefix:<15} {count:>10,} ({percentage:>5.1f}%)")
+            percentage = (count / dataset_totals[dataset]) * 100
+            lines.append(f"  {i:>2}. {prefix:<15} {count:>10,} ({percentage:>5.1f}%)")
     
     # Prefixes that appear in multiple datasets
     datasets_per_prefix = defaultdict(set)
@@ -130,8 +131,8 @@ def print_summary_report(results: Dict[str, Dict[str, int]]):
                              if len(datasets) > 1}
     
     if multi_dataset_prefixes:
-        print(f"\n🔗 PREFIXES FAILING IN MULTIPLE DATASETS ({len(multi_dataset_prefixes)} total):")
-        print("-" * 60)
+        lines.append(f"\n🔗 PREFIXES FAILING IN MULTIPLE DATASETS ({len(multi_dataset_prefixes)} total):")
+        lines.append("-" * 60)
         
         # Sort by how many datasets they appear in, then by total count
         sorted_multi = sorted(multi_dataset_prefixes.items(), 
@@ -141,15 +142,15 @@ def print_summary_report(results: Dict[str, Dict[str, int]]):
         for prefix, datasets in sorted_multi:
             dataset_list = ", ".join(sorted(datasets))
             total = prefix_totals[prefix]
-            print(f"  {prefix:<15} in {len(datasets)} datasets ({dataset_list:>25}) - {total:>8,} total")
+            lines.append(f"  {prefix:<15} in {len(datasets)} datasets ({dataset_list:>25}) - {total:>8,} total")
     
-    print("\n" + "="*80)
+    lines.append("\n" + "="*80)
+    
+    print('\n'.join(lines))
 
 
 def write_detailed_csv_report(results: Dict[str, Dict[str, int]], output_path: Path):
     """Write a detailed CSV report for further analysis."""
-    import csv
-    
     # Collect all unique prefixes
     all_prefixes = set()
     for prefix_counts in results.values():
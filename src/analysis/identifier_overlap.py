@@ -11,17 +11,46 @@ to understand:
 5. Coverage statistics and implications
 """
 
+import csv
 import json
 import logging
+import pickle
+from array import array
 from pathlib import Path
-from collections import defaultdict, Counter
-from typing import Dict, Set, List, Tuple
-import pandas as pd
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Read-ahead for the multi-GB cleaned JSONL files (the 8 KiB default means far more read() calls)
+READ_BUFFER_SIZE = 1 << 20
+
+# Dataset membership bitmask for each overlap category (bit 0 = NGD, bit 1 = PubTator, bit 2 = OmniCorp)
+OVERLAP_CATEGORY_MASKS = {
+    'all_three': 0b111,
+    'ngd_pubtator_only': 0b011,
+    'ngd_omnicorp_only': 0b101,
+    'pubtator_omnicorp_only': 0b110,
+    'ngd_only': 0b001,
+    'pubtator_only': 0b010,
+    'omnicorp_only': 0b100
+}
+
+# Ingest state persisted between runs; curie_ids and prefix_codes are rebuilt from these
+INGEST_CACHE_FIELDS = ['curies', 'identifier_counts', 'curie_membership',
+                       'curie_prefix_codes', 'prefixes']
+
+
+def write_csv(output_path: Path, header: List[str], rows: Iterable[tuple]):
+    """Write rows straight to a CSV file without building an intermediate DataFrame."""
+    with open(output_path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile, lineterminator='\n')
+        writer.writerow(header)
+        writer.writerows(rows)
+
 
 class IdentifierOverlapAnalyzer:
     """Analyze identifier overlap patterns across NGD, PubTator, and OmniCorp."""
@@ -33,24 +62,35 @@ class IdentifierOverlapAnalyzer:
             'PubTator': Path('../../cleaned/pubtator/pubtator_cleaned.jsonl'),
             'OmniCorp': Path('../../cleaned/omnicorp/omnicorp_cleaned.jsonl')
         }
+        self.ingest_cache_file = Path('../../analysis_results/identifier_overlap/ingest_cache.pkl')
         
         # Storage for analysis results
-        self.identifiers_by_dataset = {}  # dataset_name -> set of CURIEs
-        self.curie_details = {}  # curie -> {datasets: [list], prefix: str, total_pmids: int}
-        self.biolink_data = {}  # curie -> biolink_types (from biolink classes files)
-        
-    def load_dataset_identifiers(self, dataset_name: str, file_path: Path) -> Set[str]:
-        """Load all normalized CURIEs from a dataset."""
+        self.curie_ids = {}  # curie -> dense integer id shared across datasets
+        self.curies = []  # integer id -> curie
+        self.identifier_counts = {}  # dataset_name -> number of distinct CURIEs
+        
+        # Per-CURIE details stored column-wise, indexed by CURIE id
+        self.curie_membership = bytearray()  # bit i set if the CURIE is in self.datasets[i]
+        self.curie_prefix_codes = array('H')  # index into self.prefixes
+        self.prefixes = []  # prefix code -> prefix
+        self.prefix_codes = {}  # prefix -> prefix code
+        self.biolink_data = {}  # curie -> bitmask of biolink type codes (from biolink classes files)
+        self.biolink_types = []  # biolink type code -> biolink type
+        self.biolink_codes = {}  # biolink type -> biolink type code
+        
+    def load_dataset_identifiers(self, dataset_name: str, file_path: Path) -> int:
+        """Load all normalized CURIEs from a dataset into the membership column.
+        Returns the number of distinct CURIEs in the dataset."""
         logger.info(f"Loading identifiers from {dataset_name}: {file_path}")
         
         if not file_path.exists():
             logger.error(f"File not found: {file_path}")
-            return set()
+            return 0
         
-        identifiers = set()
-        pmid_counts = {}
+        identifier_count = 0
+        dataset_bit = 1 << self.datasets.index(dataset_name)
         
-        with open(file_path, 'r') as f:
+        with open(file_path, 'r', buffering=READ_BUFFER_SIZE, encoding='utf-8') as f:
             for line_num, line in enumerate(f, 1):
                 if line_num % 1000000 == 0:
                     logger.info(f"  Processed {line_num:,} records from {dataset_name}")
@@ -58,30 +98,25 @@ class IdentifierOverlapAnalyzer:
                 try:
                     record = json.loads(line.strip())
                     curie = record['curie']
-                    identifiers.add(curie)
-                    
-                    # Track PMID counts for later analysis
-                    pmid_count = len(record.get('publications', []))
-                    pmid_counts[curie] = pmid_count
                     
-                    # Store details for this CURIE
-                    if curie not in self.curie_details:
-                        self.curie_details[curie] = {
-                            'datasets': [],
-                            'prefix': curie.split(':', 1)[0] if ':' in curie else 'NO_PREFIX',
-                            'pmid_counts': {}
-                        }
+                    # Intern the CURIE so overlaps are computed on small ints, not long strings
+                    curie_id = self.curie_ids.get(curie)
+                    if curie_id is None:
+                        curie_id = self.add_curie(curie)
                     
-                    self.curie_details[curie]['datasets'].append(dataset_name)
-                    self.curie_details[curie]['pmid_counts'][dataset_name] = pmid_count
+                    # Record the dataset for this CURIE, counting it the first time it is seen here
+                    membership = self.curie_membership[curie_id]
+                    if not membership & dataset_bit:
+                        self.curie_membership[curie_id] = membership | dataset_bit
+                        identifier_count += 1
                     
                 except json.JSONDecodeError:
                     logger.warning(f"Invalid JSON on line {line_num} in {dataset_name}")
                 except KeyError as e:
                     logger.warning(f"Missing key {e} on line {line_num} in {dataset_name}")
         
-        logger.info(f"  Loaded {len(identifiers):,} unique identifiers from {dataset_name}")
-        return identifiers
+        logger.info(f"  Loaded {identifier_count:,} unique identifiers from {dataset_name}")
+        return identifier_count
     
     def load_biolink_classes(self):
         """Load biolink type information for CURIEs."""
@@ -109,92 +144,176 @@ class IdentifierOverlapAnalyzer:
                     curie_classes = data
                 
                 for curie, biolink_types in curie_classes.items():
-                    if curie not in self.biolink_data:
-                        self.biolink_data[curie] = set()
-                    
                     # Add biolink types (might be list or single item)
-                    if isinstance(biolink_types, list):
-                        self.biolink_data[curie].update(biolink_types)
-                    else:
-                        self.biolink_data[curie].add(biolink_types)
+                    if not isinstance(biolink_types, list):
+                        biolink_types = [biolink_types]
+                    
+                    # Only ~100 distinct biolink types exist, so store each CURIE's types
+                    # as a bitmask of type codes instead of a set of repeated strings
+                    mask = self.biolink_data.get(curie, 0)
+                    for biolink_type in biolink_types:
+                        code = self.biolink_codes.get(biolink_type)
+                        if code is None:
+                            code = self.biolink_codes[biolink_type] = len(self.biolink_types)
+                            self.biolink_types.append(biolink_type)
+                        mask |= 1 << code
+                    self.biolink_data[curie] = mask
+    
+    def ingest_fingerprint(self) -> List[tuple]:
+        """Path, size and mtime of each input file; the ingest cache is only valid for these."""
+        fingerprint = []
+        for dataset_name, file_path in self.data_paths.items():
+            stat = file_path.stat() if file_path.exists() else None
+            fingerprint.append((dataset_name, str(file_path),
+                                stat.st_size if stat else None, stat.st_mtime_ns if stat else None))
+        return fingerprint
+    
+    def load_ingest_cache(self, cache_file: Path, fingerprint: List[tuple]) -> bool:
+        """Restore ingest state from a previous run. Returns False if there is no cache,
+        it was built from different input files, or it predates the current cache fields."""
+        if not cache_file.exists():
+            return False
+        
+        with open(cache_file, 'rb') as f:
+            state = pickle.load(f)
+        if state.get('fingerprint') != fingerprint:
+            logger.info(f"Input files changed since {cache_file} was written, re-ingesting")
+            return False
+        if not all(field in state for field in INGEST_CACHE_FIELDS):
+            logger.info(f"{cache_file} was written by an older version, re-ingesting")
+            return False
+        
+        logger.info(f"Loading cached identifier ingest from {cache_file}")
+        for field in INGEST_CACHE_FIELDS:
+            setattr(self, field, state[field])
+        self.curie_ids = {curie: curie_id for curie_id, curie in enumerate(self.curies)}
+        self.prefix_codes = {prefix: code for code, prefix in enumerate(self.prefixes)}
+        return True
+    
+    def save_ingest_cache(self, cache_file: Path, fingerprint: List[tuple]):
+        """Persist ingest state so report-only reruns can skip parsing the JSONL files.
+        The single cache file is overwritten, so stale ingests never accumulate."""
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        state = {field: getattr(self, field) for field in INGEST_CACHE_FIELDS}
+        state['fingerprint'] = fingerprint
+        with open(cache_file, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        logger.info(f"Saved identifier ingest cache to {cache_file}")
     
     def analyze_overlaps(self):
         """Compute overlap statistics between datasets."""
         logger.info("Analyzing identifier overlaps")
         
-        # Load all datasets
-        for dataset_name, file_path in self.data_paths.items():
-            self.identifiers_by_dataset[dataset_name] = self.load_dataset_identifiers(dataset_name, file_path)
+        # Load all datasets, reusing the previous ingest if the input files are unchanged
+        fingerprint = self.ingest_fingerprint()
+        if not self.load_ingest_cache(self.ingest_cache_file, fingerprint):
+            for dataset_name, file_path in self.data_paths.items():
+                self.identifier_counts[dataset_name] = self.load_dataset_identifiers(dataset_name, file_path)
+            self.save_ingest_cache(self.ingest_cache_file, fingerprint)
         
         # Load biolink classifications
         self.load_biolink_classes()
         
-        # Compute overlaps
-        ngd_ids = self.identifiers_by_dataset['NGD']
-        pubtator_ids = self.identifiers_by_dataset['PubTator']
-        omnicorp_ids = self.identifiers_by_dataset['OmniCorp']
-        
-        # All possible intersections
-        all_three = ngd_ids & pubtator_ids & omnicorp_ids
-        ngd_pubtator_only = (ngd_ids & pubtator_ids) - omnicorp_ids
-        ngd_omnicorp_only = (ngd_ids & omnicorp_ids) - pubtator_ids
-        pubtator_omnicorp_only = (pubtator_ids & omnicorp_ids) - ngd_ids
-        ngd_only = ngd_ids - pubtator_ids - omnicorp_ids
-        pubtator_only = pubtator_ids - ngd_ids - omnicorp_ids
-        omnicorp_only = omnicorp_ids - ngd_ids - pubtator_ids
-        
-        # Store overlap results
+        # Every overlap category is an exact dataset bitmask, so one scan of the
+        # membership column per category replaces the chains of set differences
+        membership = np.frombuffer(self.curie_membership, dtype=np.uint8)
         self.overlaps = {
-            'all_three': all_three,
-            'ngd_pubtator_only': ngd_pubtator_only,
-            'ngd_omnicorp_only': ngd_omnicorp_only,
-            'pubtator_omnicorp_only': pubtator_omnicorp_only,
-            'ngd_only': ngd_only,
-            'pubtator_only': pubtator_only,
-            'omnicorp_only': omnicorp_only
+            category: np.flatnonzero(membership == mask)
+            for category, mask in OVERLAP_CATEGORY_MASKS.items()
         }
+        del membership  # release the view so curie_membership stays resizable
+        
+        # Compute totals for verification; every interned CURIE came from some dataset,
+        # so the union size is just the number of interned CURIEs
+        total_unique = len(self.curies)
+        computed_total = sum(len(curie_ids) for curie_ids in self.overlaps.values())
         
-        # Compute totals for verification
-        total_unique = len(ngd_ids | pubtator_ids | omnicorp_ids)
-        computed_total = len(all_three) + len(ngd_pubtator_only) + len(ngd_omnicorp_only) + \
-                        len(pubtator_omnicorp_only) + len(ngd_only) + len(pubtator_only) + len(omnicorp_only)
+        # Each CURIE is counted once per dataset it appears in, so the dataset sizes
+        # must equal the category sizes weighted by their number of datasets
+        dataset_total = sum(self.identifier_counts.values())
+        weighted_total = sum(bin(mask).count('1') * len(self.overlaps[category])
+                             for category, mask in OVERLAP_CATEGORY_MASKS.items())
         
         logger.info(f"Total unique identifiers across all datasets: {total_unique:,}")
         logger.info(f"Sum of overlap categories: {computed_total:,}")
         assert total_unique == computed_total, "Overlap calculation error"
+        assert dataset_total == weighted_total, "Overlap calculation error"
     
-    def analyze_by_prefix(self):
-        """Analyze overlaps by identifier prefix."""
-        logger.info("Analyzing overlaps by prefix")
-        
-        prefix_overlaps = defaultdict(lambda: defaultdict(int))
-        
-        for overlap_type, curie_set in self.overlaps.items():
-            for curie in curie_set:
-                prefix = curie.split(':', 1)[0] if ':' in curie else 'NO_PREFIX'
-                prefix_overlaps[overlap_type][prefix] += 1
-        
-        return prefix_overlaps
+    def add_curie(self, curie: str) -> int:
+        """Assign the next CURIE id and allocate its per-CURIE detail slots."""
+        curie_id = self.curie_ids[curie] = len(self.curies)
+        self.curies.append(curie)
+        self.curie_membership.append(0)
+        
+        # Materialize the prefix once per CURIE; breakdowns count codes instead of splitting strings
+        prefix, sep, _ = curie.partition(':')
+        prefix = prefix if sep else 'NO_PREFIX'
+        prefix_code = self.prefix_codes.get(prefix)
+        if prefix_code is None:
+            prefix_code = self.prefix_codes[prefix] = len(self.prefixes)
+            self.prefixes.append(prefix)
+        self.curie_prefix_codes.append(prefix_code)
+        
+        return curie_id
+    
+    def resolve_curies(self, curie_ids) -> List[str]:
+        """Map interned CURIE ids back to their CURIE strings."""
+        if isinstance(curie_ids, np.ndarray):
+            curie_ids = curie_ids.tolist()
+        curies = self.curies
+        return [curies[curie_id] for curie_id in curie_ids]
     
-    def analyze_by_biolink_type(self):
-        """Analyze overlaps by biolink type."""
-        logger.info("Analyzing overlaps by biolink type")
+    def count_prefixes(self, curie_ids: np.ndarray) -> Dict[str, int]:
+        """Count interned CURIEs by identifier prefix, in prefix order."""
+        # Only a few dozen distinct prefixes, so tally the per-CURIE prefix codes
+        prefix_codes = np.frombuffer(self.curie_prefix_codes, dtype=np.uint16)[curie_ids]
+        prefix_counts = np.bincount(prefix_codes, minlength=len(self.prefixes))
+        return {self.prefixes[code]: int(prefix_counts[code])
+                for code in sorted(range(len(self.prefixes)), key=self.prefixes.__getitem__)
+                if prefix_counts[code]}
+    
+    def decode_biolink_mask(self, mask: int) -> List[str]:
+        """Expand a biolink type bitmask back into biolink type names."""
+        biolink_types = []
+        while mask:
+            low_bit = mask & -mask
+            biolink_types.append(self.biolink_types[low_bit.bit_length() - 1])
+            mask ^= low_bit
+        return biolink_types
+    
+    def count_biolink_types(self, curies: List[str]) -> Dict[str, int]:
+        """Count CURIEs by biolink type (CURIEs without classes count as 'Unknown')."""
+        # Tally distinct type combinations first (Counter consumes the generator in C),
+        # then expand each combination once
+        biolink_data = self.biolink_data
+        mask_counts = Counter(biolink_data.get(curie) for curie in curies)
+        
+        biolink_counts = Counter()
+        for mask, count in mask_counts.items():
+            biolink_types = ['Unknown'] if mask is None else self.decode_biolink_mask(mask)
+            for biolink_type in biolink_types:
+                biolink_counts[biolink_type] += count
+        
+        return dict(biolink_counts)
+    
+    def analyze_breakdowns(self) -> Tuple[Dict, Dict]:
+        """Analyze overlaps by prefix and biolink type in a single pass over each category."""
+        logger.info("Analyzing overlaps by prefix and biolink type")
         
-        biolink_overlaps = defaultdict(lambda: defaultdict(int))
+        prefix_overlaps = {}
+        biolink_overlaps = {}
         
-        for overlap_type, curie_set in self.overlaps.items():
-            for curie in curie_set:
-                biolink_types = self.biolink_data.get(curie, ['Unknown'])
-                for biolink_type in biolink_types:
-                    biolink_overlaps[overlap_type][biolink_type] += 1
+        for overlap_type, id_set in self.overlaps.items():
+            prefix_overlaps[overlap_type] = self.count_prefixes(id_set)
+            biolink_overlaps[overlap_type] = self.count_biolink_types(self.resolve_curies(id_set))
         
-        return biolink_overlaps
+        return prefix_overlaps, biolink_overlaps
     
     def generate_summary_report(self):
         """Generate comprehensive summary report."""
         logger.info("Generating summary report")
         
-        total_ids = {name: len(ids) for name, ids in self.identifiers_by_dataset.items()}
+        total_ids = self.identifier_counts
         
         print("\n" + "="*80)
         print("IDENTIFIER OVERLAP ANALYSIS REPORT")
@@ -235,10 +354,10 @@ class IdentifierOverlapAnalyzer:
         
         # What percentage of each dataset's identifiers appear in others?
         for dataset in self.datasets:
-            dataset_ids = self.identifiers_by_dataset[dataset]
-            in_any_other = len(dataset_ids) - len(self.overlaps[f'{dataset.lower()}_only'])
-            coverage = (in_any_other / len(dataset_ids)) * 100 if dataset_ids else 0
-            print(f"{dataset} identifiers also in other datasets: {in_any_other:,}/{len(dataset_ids):,} ({coverage:.1f}%)")
+            dataset_count = self.identifier_counts[dataset]
+            in_any_other = dataset_count - len(self.overlaps[f'{dataset.lower()}_only'])
+            coverage = (in_any_other / dataset_count) * 100 if dataset_count else 0
+            print(f"{dataset} identifiers also in other datasets: {in_any_other:,}/{dataset_count:,} ({coverage:.1f}%)")
     
     def generate_detailed_reports(self, output_dir: Path):
         """Generate detailed CSV reports for further analysis."""
@@ -256,54 +375,34 @@ class IdentifierOverlapAnalyzer:
             ('PubTator_Only', 'pubtator_only'),
             ('OmniCorp_Only', 'omnicorp_only')
         ]:
-            overlap_summary.append({
-                'Category': category_name,
-                'Count': len(self.overlaps[category_key])
-            })
+            overlap_summary.append((category_name, len(self.overlaps[category_key])))
         
-        pd.DataFrame(overlap_summary).to_csv(output_dir / 'overlap_summary.csv', index=False)
+        write_csv(output_dir / 'overlap_summary.csv', ['Category', 'Count'], overlap_summary)
         
-        # 2. Prefix analysis CSV
-        prefix_data = self.analyze_by_prefix()
-        prefix_rows = []
-        
-        for overlap_type, prefix_counts in prefix_data.items():
-            for prefix, count in prefix_counts.items():
-                prefix_rows.append({
-                    'Overlap_Type': overlap_type,
-                    'Prefix': prefix,
-                    'Count': count
-                })
+        # Prefix and biolink breakdowns share one walk over the overlap categories
+        prefix_data, biolink_data = self.analyze_breakdowns()
         
-        pd.DataFrame(prefix_rows).to_csv(output_dir / 'overlap_by_prefix.csv', index=False)
+        # 2. Prefix analysis CSV
+        prefix_rows = (
+            (overlap_type, prefix, count)
+            for overlap_type, prefix_counts in prefix_data.items()
+            for prefix, count in prefix_counts.items()
+        )
+        write_csv(output_dir / 'overlap_by_prefix.csv', ['Overlap_Type', 'Prefix', 'Count'], prefix_rows)
         
         # 3. Biolink type analysis CSV
-        biolink_data = self.analyze_by_biolink_type()
-        biolink_rows = []
-        
-        for overlap_type, biolink_counts in biolink_data.items():
-            for biolink_type, count in biolink_counts.items():
-                biolink_rows.append({
-                    'Overlap_Type': overlap_type,
-                    'Biolink_Type': biolink_type,
-                    'Count': count
-                })
-        
-        pd.DataFrame(biolink_rows).to_csv(output_dir / 'overlap_by_biolink_type.csv', index=False)
-        
-        # 4. Sample identifiers from each overlap category
-        samples = {}
-        for category_key, curie_set in self.overlaps.items():
-            # Sample up to 100 identifiers from each category
-            sample_size = min(100, len(curie_set))
-            samples[category_key] = list(curie_set)[:sample_size]
-        
-        # Write samples to separate files for inspection
-        for category_key, sample_curies in samples.items():
+        biolink_rows = (
+            (overlap_type, biolink_type, count)
+            for overlap_type, biolink_counts in biolink_data.items()
+            for biolink_type, count in biolink_counts.items()
+        )
+        write_csv(output_dir / 'overlap_by_biolink_type.csv', ['Overlap_Type', 'Biolink_Type', 'Count'], biolink_rows)
+        
+        # 4. Sample up to 100 identifiers from each overlap category, one write per file
+        for category_key, curie_ids in self.overlaps.items():
+            sample_curies = self.resolve_curies(curie_ids[:100])
             sample_file = output_dir / f'sample_identifiers_{category_key}.txt'
-            with open(sample_file, 'w') as f:
-                for curie in sample_curies:
-                    f.write(f"{curie}\n")
+            sample_file.write_text(''.join(f"{curie}\n" for curie in sample_curies))
         
         logger.info(f"Generated detailed reports in {output_dir}")
     
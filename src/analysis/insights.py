@@ -6,7 +6,10 @@ This script provides actionable insights from the failed normalization data
 to help prioritize fixes and understand the data quality across sources.
 """
 
-print("""
+
+def main():
+    """Print the key insights from the failed normalization analysis."""
+    print("""
 🔍 KEY INSIGHTS FROM FAILED NORMALIZATION ANALYSIS
 ==================================================
 
@@ -92,5 +95,6 @@ The pipeline successfully normalized the vast majority of identifiers:
 5. Review API timeout handling for commonly failing prefixes (MESH, etc.)
 """)
 
+
 if __name__ == "__main__":
-    pass
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -10,16 +10,71 @@ This script analyzes which MEDI drugs/diseases are:
 Provides a comprehensive view of data availability across knowledge sources.
 """
 
+import csv
 import json
+import hashlib
+import os
+import re
+import pickle
+import numpy as np
 import pandas as pd
 import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, Set, Tuple
+from typing import Dict, List, Set, Tuple
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+NORMALIZATION_CACHE_FILE = Path("analysis_results/medi_inspection/normalization_cache.pkl")
+READ_BUFFER_SIZE = 8 << 20
+MIN_PARSE_CHUNK_SIZE = 64 << 20
+
+# Top-level "id" of a RoboKOP node line, matched before any nested object opens
+NODE_ID_PATTERN = re.compile(rb'^\s*\{[^{]*?"id"\s*:\s*"([^"\\]+)"')
+
+LITERATURE_COLUMNS = ['ngd_renorm_present', 'pubtator_renorm_present', 'omnicorp_renorm_present']
+
+
+def load_node_ids_chunk(robokop_nodefile: str, start: int, end: int) -> Set[str]:
+    """Collect node identifiers from the JSONL lines that begin within the byte range [start, end)."""
+    nodes = set()
+    
+    # Read raw bytes with a large buffer; json.loads decodes UTF-8 itself and ignores the newline
+    with open(robokop_nodefile, "rb", buffering=READ_BUFFER_SIZE) as inf:
+        # Skip the partial line owned by the previous chunk (a line starting exactly at start is kept)
+        if start:
+            inf.seek(start - 1)
+            inf.readline()
+        offset = inf.tell()
+        
+        while offset < end:
+            line = inf.readline()
+            if not line:
+                break
+            line_offset = offset
+            offset += len(line)
+            
+            try:
+                # Only the id is needed, so avoid decoding the whole node object when possible
+                match = NODE_ID_PATTERN.match(line)
+                if match:
+                    node_id = match.group(1).decode()
+                else:
+                    node_id = json.loads(line).get('id')
+                
+                if node_id:
+                    nodes.add(node_id)
+                    
+            except json.JSONDecodeError as e:
+                logger.warning(f"Error parsing JSON at byte {line_offset:,}: {e}")
+            except Exception as e:
+                logger.warning(f"Error processing line at byte {line_offset:,}: {e}")
+    
+    return nodes
+
 
 def load_normalized_nodes(robokop_nodefile: str) -> Set[str]:
     """Load node identifiers from RoboKOP nodes file (supports .jsonl and .csv formats)."""
@@ -29,45 +84,103 @@ def load_normalized_nodes(robokop_nodefile: str) -> Set[str]:
     
     if robokop_nodefile.endswith('.jsonl'):
         # New format: JSONL with 'id' field
-        with open(robokop_nodefile, "r") as inf:
-            for line_num, line in enumerate(inf, 1):
-                try:
-                    node = json.loads(line.strip())
-                    node_id = node.get('id')
-                    
-                    if node_id:
-                        nodes.add(node_id)
-                    
-                    if line_num % 100000 == 0:
-                        logger.info(f"  Processed {line_num:,} lines, found {len(nodes):,} unique nodes")
-                        
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Error parsing JSON on line {line_num}: {e}")
-                except Exception as e:
-                    logger.warning(f"Error processing line {line_num}: {e}")
+        # Records are newline-delimited, so the file splits cleanly into byte ranges parsed in parallel
+        file_size = os.path.getsize(robokop_nodefile)
+        num_chunks = max(1, min(os.cpu_count() or 1, file_size // MIN_PARSE_CHUNK_SIZE))
+        boundaries = [file_size * i // num_chunks for i in range(num_chunks + 1)]
+        
+        if num_chunks == 1:
+            nodes = load_node_ids_chunk(robokop_nodefile, 0, file_size)
+        else:
+            logger.info(f"  Parsing {file_size:,} bytes in {num_chunks} parallel chunks")
+            with ProcessPoolExecutor(max_workers=num_chunks) as executor:
+                for chunk_nodes in executor.map(load_node_ids_chunk, repeat(robokop_nodefile), boundaries[:-1], boundaries[1:]):
+                    nodes |= chunk_nodes
+                    logger.info(f"  Found {len(nodes):,} unique nodes so far")
     else:
         # Legacy format: CSV with OriginalCURIE,NormalizedCURIE columns
-        with open(robokop_nodefile, "r") as inf:
-            header = inf.readline()  # Skip header: OriginalCURIE,NormalizedCURIE
-            for line_num, line in enumerate(inf, 1):
-                try:
-                    parts = line.strip().split(",")
-                    if len(parts) >= 2:
-                        normalized_curie = parts[1].strip()
-                        if normalized_curie:
-                            nodes.add(normalized_curie)
-                    
-                    if line_num % 100000 == 0:
-                        logger.info(f"  Processed {line_num:,} lines, found {len(nodes):,} unique nodes")
-                        
-                except Exception as e:
-                    logger.warning(f"Error parsing line {line_num}: {e}")
+        # Only the NormalizedCURIE column is parsed; usecols also tolerates rows with extra fields
+        try:
+            normalized_curies = pd.read_csv(robokop_nodefile, usecols=[1], dtype=object, na_filter=False,
+                                            quoting=csv.QUOTE_NONE, low_memory=False).iloc[:, 0]
+        except pd.errors.EmptyDataError:
+            normalized_curies = pd.Series([], dtype=object)
+        
+        # Deduplicate before stripping so each distinct value is only touched once
+        nodes = {curie.strip() for curie in pd.unique(normalized_curies.to_numpy())}
+        nodes.discard('')
     
     logger.info(f"Loaded {len(nodes):,} unique node identifiers from RoboKOP")
     return nodes
 
 
-def load_medi_coverage(identifiers: Dict[str, Set[str]]) -> Tuple[Dict, Dict]:
+def load_identifier_array(pickle_file: Path) -> np.ndarray:
+    """Load a pickled identifier set as a sorted, memory-mapped array of UTF-8 encoded CURIEs.
+    
+    The array is cached as a .npy file next to the pickle and rebuilt whenever the pickle is newer,
+    so only the first run pays for unpickling the full set of strings.
+    """
+    array_file = pickle_file.with_suffix('.npy')
+    
+    if not array_file.exists() or array_file.stat().st_mtime < pickle_file.stat().st_mtime:
+        logger.info(f"  Building sorted identifier array {array_file}")
+        with open(pickle_file, 'rb') as f:
+            identifiers = pickle.load(f)
+        np.save(array_file, np.sort(np.array([curie.encode() for curie in identifiers], dtype=bytes)))
+    
+    return np.load(array_file, mmap_mode='r')
+
+
+def sorted_membership(values: np.ndarray, sorted_ids: np.ndarray) -> np.ndarray:
+    """Return a boolean mask of which values occur in the sorted identifier array."""
+    positions = np.searchsorted(sorted_ids, values)
+    found = positions < len(sorted_ids)
+    found[found] = sorted_ids[positions[found]] == values[found]
+    return found
+
+
+def build_coverage(entity_ids: Set[str], labels: Dict[str, str], identifiers: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """Build a label and per-dataset presence table indexed by normalized entity ID."""
+    coverage = pd.DataFrame(index=pd.Index(sorted(entity_ids), dtype=object))
+    coverage['label'] = pd.Series(labels, dtype=object).reindex(coverage.index).fillna('')
+    
+    encoded_ids = np.array([entity_id.encode() for entity_id in coverage.index], dtype=bytes)
+    for dataset in ['ngd', 'pubtator', 'omnicorp']:
+        coverage[f'{dataset}_renorm_present'] = sorted_membership(encoded_ids, identifiers[dataset])
+    
+    return coverage
+
+
+def normalize_with_cache(normalizer, curies: List[str], cache_file: Path = NORMALIZATION_CACHE_FILE) -> Dict[str, str]:
+    """Normalize CURIEs, reusing the previous run's result if it was for the same CURIEs and normalizer settings.
+    
+    The cache is a single file that each new normalization overwrites.
+    """
+    # The endpoint and request options decide the answers as much as the CURIEs do
+    settings = (normalizer.api_client.base_url, sorted(normalizer.normalization_options.items()))
+    key = hashlib.blake2b(repr((settings, sorted(curies))).encode(), digest_size=16).hexdigest()
+    
+    try:
+        with open(cache_file, 'rb') as f:
+            cached = pickle.load(f)
+        if cached.get('key') == key:
+            logger.info(f"Loading cached normalizations for {len(curies)} CURIEs from {cache_file}")
+            return cached['normalizations']
+    except FileNotFoundError:
+        pass
+    
+    normalizations = normalizer.normalize_curies(curies, {})
+    
+    # An empty mapping means the API call failed outright; don't persist that
+    if normalizations:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_file, 'wb') as f:
+            pickle.dump({'key': key, 'normalizations': normalizations}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    
+    return normalizations
+
+
+def load_medi_coverage(identifiers: Dict[str, np.ndarray]) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """Generate MEDI drug and disease coverage data from source files."""
     logger.info("Generating MEDI coverage data from source files")
     
@@ -84,74 +197,57 @@ def load_medi_coverage(identifiers: Dict[str, Set[str]]) -> Tuple[Dict, Dict]:
         'input/medi/Contraindications List.csv'
     ]
     
-    all_drugs = set()
-    all_diseases = set() 
-    drug_labels = {}
-    disease_labels = {}
+    drug_col = 'final normalized drug id'
+    disease_col = 'final normalized disease id'
+    drug_label_col = 'final normalized drug label'
+    disease_label_col = 'final normalized disease label'
     
+    # Only the ID and label columns are needed; skip parsing everything else
+    wanted_cols = {drug_col, disease_col, drug_label_col, disease_label_col}
+    
+    frames = []
     for filename in input_files:
         logger.info(f"Processing {filename}")
-        df = pd.read_csv(filename)
-        
-        # Determine column names based on file
-        if 'Indications' in filename:
-            drug_col = 'final normalized drug id'
-            disease_col = 'final normalized disease id'
-        else:  # Contraindications
-            drug_col = 'final normalized drug id'  
-            disease_col = 'final normalized disease id'
-            
-        drug_label_col = 'final normalized drug label'
-        disease_label_col = 'final normalized disease label'
+        df = pd.read_csv(filename, usecols=lambda col: col in wanted_cols, dtype=str)
         
         # Remove rows with missing IDs
-        df = df.dropna(subset=[drug_col, disease_col])
-        
-        # Collect unique entities for normalization
-        unique_drugs = set(df[drug_col].dropna().unique())
-        unique_diseases = set(df[disease_col].dropna().unique())
-        
-        # Normalize entities
-        logger.info(f"Normalizing {len(unique_drugs)} drugs and {len(unique_diseases)} diseases from {filename}")
-        drug_normalizations = normalizer.normalize_curies(list(unique_drugs), {})
-        disease_normalizations = normalizer.normalize_curies(list(unique_diseases), {})
-        
-        # Collect normalized entities and labels
-        for _, row in df.iterrows():
-            if pd.notna(row[drug_col]):
-                orig_drug_id = row[drug_col]
-                norm_drug_id = drug_normalizations.get(orig_drug_id)
-                if norm_drug_id:
-                    all_drugs.add(norm_drug_id)
-                    if drug_label_col in df.columns and pd.notna(row[drug_label_col]):
-                        drug_labels[norm_drug_id] = row[drug_label_col]
-                        
-            if pd.notna(row[disease_col]):
-                orig_disease_id = row[disease_col]
-                norm_disease_id = disease_normalizations.get(orig_disease_id)
-                if norm_disease_id:
-                    all_diseases.add(norm_disease_id)
-                    if disease_label_col in df.columns and pd.notna(row[disease_label_col]):
-                        disease_labels[norm_disease_id] = row[disease_label_col]
-    
-    # Build coverage dictionaries
-    drugs = {}
-    for drug_id in all_drugs:
-        drugs[drug_id] = {
-            'label': drug_labels.get(drug_id, ''),
-            'ngd_renorm_present': drug_id in identifiers['ngd'] if drug_id is not None else False,
-            'pubtator_renorm_present': drug_id in identifiers['pubtator'] if drug_id is not None else False,
-            'omnicorp_renorm_present': drug_id in identifiers['omnicorp'] if drug_id is not None else False
-        }
-    
-    diseases = {}
-    for disease_id in all_diseases:
-        diseases[disease_id] = {
-            'label': disease_labels.get(disease_id, ''),
-            'ngd_renorm_present': disease_id in identifiers['ngd'] if disease_id is not None else False,
-            'pubtator_renorm_present': disease_id in identifiers['pubtator'] if disease_id is not None else False,
-            'omnicorp_renorm_present': disease_id in identifiers['omnicorp'] if disease_id is not None else False
-        }
+        frames.append(df.dropna(subset=[drug_col, disease_col]))
+    
+    # Files are kept in order so later rows still win on label conflicts
+    df = pd.concat(frames, ignore_index=True)
+    
+    # Labels repeat on every row of an entity; categorical storage keeps a single copy of each string
+    label_cols = [col for col in (drug_label_col, disease_label_col) if col in df.columns]
+    df[label_cols] = df[label_cols].astype('category')
+    
+    # Collect unique entities across both files so shared CURIEs are normalized once
+    unique_drugs = set(df[drug_col].unique())
+    unique_diseases = set(df[disease_col].unique())
+    
+    # Normalize drugs and diseases in a single API round trip
+    logger.info(f"Normalizing {len(unique_drugs)} drugs and {len(unique_diseases)} diseases")
+    normalizations = normalize_with_cache(normalizer, list(unique_drugs | unique_diseases))
+    
+    # Collect normalized entities and labels (vectorized; later rows win on label conflicts)
+    norm_drug_ids = df[drug_col].map(normalizations)
+    has_drug = norm_drug_ids.notna()
+    all_drugs = set(norm_drug_ids[has_drug].unique())
+    drug_labels = {}
+    if drug_label_col in df.columns:
+        labeled = has_drug & df[drug_label_col].notna()
+        drug_labels.update(zip(norm_drug_ids[labeled], df.loc[labeled, drug_label_col]))
+    
+    norm_disease_ids = df[disease_col].map(normalizations)
+    has_disease = norm_disease_ids.notna()
+    all_diseases = set(norm_disease_ids[has_disease].unique())
+    disease_labels = {}
+    if disease_label_col in df.columns:
+        labeled = has_disease & df[disease_label_col].notna()
+        disease_labels.update(zip(norm_disease_ids[labeled], df.loc[labeled, disease_label_col]))
+    
+    # Build coverage tables
+    drugs = build_coverage(all_drugs, drug_labels, identifiers)
+    diseases = build_coverage(all_diseases, disease_labels, identifiers)
     
     logger.info(f"Generated coverage for {len(drugs)} drugs and {len(diseases)} diseases")
     return drugs, diseases
@@ -161,48 +257,49 @@ def load_missing_entity_analysis(missing_entity_file: str) -> Dict:
     """Load missing entity analysis results."""
     logger.info(f"Loading missing entity analysis from {missing_entity_file}")
     
-    if not Path(missing_entity_file).exists():
+    try:
+        with open(missing_entity_file, "r") as inf:
+            entity_analysis = json.load(inf)
+    except FileNotFoundError:
         logger.warning(f"Missing entity file not found: {missing_entity_file}")
         return {}
     
-    with open(missing_entity_file, "r") as inf:
-        entity_analysis = json.load(inf)
-    
     logger.info(f"Loaded missing entity analysis with {len(entity_analysis.get('entity_gaps', []))} analyzed entities")
     return entity_analysis
 
 
-def cross_reference_with_robokop(entities: Dict, robokop_nodes: Set[str], entity_type: str) -> Dict:
+def cross_reference_with_robokop(entities: pd.DataFrame, robokop_nodes: Set[str], entity_type: str) -> pd.DataFrame:
     """Cross-reference MEDI entities with RoboKOP presence."""
     logger.info(f"Cross-referencing {len(entities)} {entity_type} with RoboKOP")
     
-    results = {}
-    in_robokop = 0
+    results = entities[['label'] + LITERATURE_COLUMNS].copy()
     
-    for entity_id, entity_data in entities.items():
-        # If we have a renormalized ID, use that; otherwise use original ID
-        renorm_id = entity_data.get('renormalized_id')
-        id_to_check = renorm_id if renorm_id else entity_id
-        
-        # Check if the ID (renormalized or original) is in RoboKOP
-        robokop_present = id_to_check in robokop_nodes
-        
-        if robokop_present:
-            in_robokop += 1
-        
-        results[entity_id] = {
-            'label': entity_data['label'],
-            'ngd_renorm_present': entity_data['ngd_renorm_present'],
-            'pubtator_renorm_present': entity_data['pubtator_renorm_present'],
-            'omnicorp_renorm_present': entity_data['omnicorp_renorm_present'],
-            'robokop_renorm_present': robokop_present
-        }
+    # If we have a renormalized ID, use that; otherwise use original ID
+    ids_to_check = entities.index.to_series()
+    if 'renormalized_id' in entities.columns:
+        renorm_ids = entities['renormalized_id']
+        ids_to_check = renorm_ids.where(renorm_ids.notna() & (renorm_ids != ''), ids_to_check)
+    
+    # Check if the ID (renormalized or original) is in RoboKOP; intersecting from the small
+    # entity side first keeps isin from hashing every RoboKOP node
+    present = set(ids_to_check) & robokop_nodes
+    results['robokop_renorm_present'] = ids_to_check.isin(present)
+    in_robokop = int(results['robokop_renorm_present'].sum())
     
     logger.info(f"  {in_robokop}/{len(entities)} {entity_type} found in RoboKOP ({in_robokop/len(entities)*100:.1f}%)")
     return results
 
 
-def generate_summary_report(drugs: Dict, diseases: Dict, output_dir: str):
+def count_source_presence(entities: pd.DataFrame) -> Tuple[int, int, int, int]:
+    """Count entities present in RoboKOP, in any literature database, in both, and in neither."""
+    in_robokop = entities['robokop_renorm_present'].to_numpy(dtype=bool)
+    in_lit = entities[LITERATURE_COLUMNS].to_numpy(dtype=bool).any(axis=1)
+    
+    return (int(in_robokop.sum()), int(in_lit.sum()),
+            int((in_robokop & in_lit).sum()), int((~in_robokop & ~in_lit).sum()))
+
+
+def generate_summary_report(drugs: pd.DataFrame, diseases: pd.DataFrame, output_dir: str):
     """Generate comprehensive summary report."""
     logger.info("Generating summary report")
     
@@ -213,21 +310,9 @@ def generate_summary_report(drugs: Dict, diseases: Dict, output_dir: str):
     total_drugs = len(drugs)
     total_diseases = len(diseases)
     
-    # RoboKOP presence
-    drugs_in_robokop = sum(1 for d in drugs.values() if d['robokop_renorm_present'])
-    diseases_in_robokop = sum(1 for d in diseases.values() if d['robokop_renorm_present'])
-    
-    # Literature database presence (any database)
-    drugs_in_lit = sum(1 for d in drugs.values() if d['ngd_renorm_present'] or d['pubtator_renorm_present'] or d['omnicorp_renorm_present'])
-    diseases_in_lit = sum(1 for d in diseases.values() if d['ngd_renorm_present'] or d['pubtator_renorm_present'] or d['omnicorp_renorm_present'])
-    
-    # Both RoboKOP and literature
-    drugs_in_both = sum(1 for d in drugs.values() if d['robokop_renorm_present'] and (d['ngd_renorm_present'] or d['pubtator_renorm_present'] or d['omnicorp_renorm_present']))
-    diseases_in_both = sum(1 for d in diseases.values() if d['robokop_renorm_present'] and (d['ngd_renorm_present'] or d['pubtator_renorm_present'] or d['omnicorp_renorm_present']))
-    
-    # Neither source
-    drugs_in_neither = sum(1 for d in drugs.values() if not d['robokop_renorm_present'] and not (d['ngd_renorm_present'] or d['pubtator_renorm_present'] or d['omnicorp_renorm_present']))
-    diseases_in_neither = sum(1 for d in diseases.values() if not d['robokop_renorm_present'] and not (d['ngd_renorm_present'] or d['pubtator_renorm_present'] or d['omnicorp_renorm_present']))
+    # RoboKOP presence, literature presence (any database), both, and neither
+    drugs_in_robokop, drugs_in_lit, drugs_in_both, drugs_in_neither = count_source_presence(drugs)
+    diseases_in_robokop, diseases_in_lit, diseases_in_both, diseases_in_neither = count_source_presence(diseases)
     
     # Generate report
     report_lines = [
@@ -270,21 +355,23 @@ def generate_summary_report(drugs: Dict, diseases: Dict, output_dir: str):
     logger.info(f"Summary report saved to {report_file}")
 
 
-def save_detailed_results(drugs: Dict, diseases: Dict, output_dir: str):
+def save_detailed_results(drugs: pd.DataFrame, diseases: pd.DataFrame, output_dir: str):
     """Save detailed results to CSV files."""
     logger.info("Saving detailed results")
     
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
     
-    # Convert to DataFrames and save
-    drugs_df = pd.DataFrame.from_dict(drugs, orient='index')
-    drugs_df.index.name = 'drug_id'
-    drugs_df.to_csv(output_path / 'medi_drugs_robokop_comparison.csv')
+    # The two tables are independent, so write them concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        writes = [
+            executor.submit(drugs.rename_axis('drug_id').to_csv, output_path / 'medi_drugs_robokop_comparison.csv'),
+            executor.submit(diseases.rename_axis('disease_id').to_csv, output_path / 'medi_diseases_robokop_comparison.csv'),
+        ]
     
-    diseases_df = pd.DataFrame.from_dict(diseases, orient='index') 
-    diseases_df.index.name = 'disease_id'
-    diseases_df.to_csv(output_path / 'medi_diseases_robokop_comparison.csv')
+    # Surface any write error
+    for write in writes:
+        write.result()
     
     logger.info(f"Detailed results saved to {output_path}")
 
@@ -300,30 +387,28 @@ def main():
     output_dir = "analysis_results/medi_inspection"
     
     # Load data - try new format first, fallback to legacy
-    from pathlib import Path
-    if Path(robokop_nodefile).exists():
+    try:
         robokop_nodes = load_normalized_nodes(robokop_nodefile)
-    elif Path(robokop_nodefile_legacy).exists():
+    except FileNotFoundError:
         logger.info(f"New nodes.jsonl not found, using legacy format: {robokop_nodefile_legacy}")
-        robokop_nodes = load_normalized_nodes(robokop_nodefile_legacy)
-    else:
-        logger.error(f"No RoboKOP nodes file found. Expected: {robokop_nodefile} or {robokop_nodefile_legacy}")
-        return
+        try:
+            robokop_nodes = load_normalized_nodes(robokop_nodefile_legacy)
+        except FileNotFoundError:
+            logger.error(f"No RoboKOP nodes file found. Expected: {robokop_nodefile} or {robokop_nodefile_legacy}")
+            return
     # Load identifier sets for coverage analysis
     logger.info("Loading identifier sets")
-    import pickle
     identifiers = {}
     identifiers_path = Path("../../analysis_results/raw_data_extracts")
     
     for dataset in ['ngd', 'pubtator', 'omnicorp']:
         pickle_file = identifiers_path / f"{dataset}_identifiers.pkl"
-        if pickle_file.exists():
-            with open(pickle_file, 'rb') as f:
-                identifiers[dataset] = pickle.load(f)
-            logger.info(f"  {dataset.upper()}: {len(identifiers[dataset]):,} identifiers")
-        else:
+        try:
+            identifiers[dataset] = load_identifier_array(pickle_file)
+        except FileNotFoundError:
             logger.error(f"Identifier file not found: {pickle_file}")
             return
+        logger.info(f"  {dataset.upper()}: {len(identifiers[dataset]):,} identifiers")
     
     drugs, diseases = load_medi_coverage(identifiers)
     # missing_analysis = load_missing_entity_analysis(missing_entity_file)  # For future use
@@ -10,8 +10,11 @@ they might be missing by searching PubMed for their labels.
 import pandas as pd
 import logging
 import json
+import os
+from functools import cached_property
+from itertools import chain
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 
 try:
     from .pubmed_search import PubMedSearcher
@@ -25,11 +28,22 @@ except ImportError:
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Presence flags written by medi_inspection.py; an entity is missing when all are False
+PRESENCE_COLUMNS = ['ngd_renorm_present', 'pubtator_renorm_present', 'omnicorp_renorm_present']
+COVERAGE_CHUNK_SIZE = 100_000
+
+
+def json_default(obj):
+    """Serialize the entity sets returned by PMID lookups as JSON arrays."""
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
 
 class MissingEntityAnalyzer:
     """Analyze completely missing drugs and diseases."""
     
-    def __init__(self):
+    def __init__(self, ncbi_api_key: Optional[str] = None):
         self.output_dir = Path('analysis_results/missing_entities')
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
@@ -37,71 +51,77 @@ class MissingEntityAnalyzer:
         self.missing_drugs = []
         self.missing_diseases = []
         
-        # Initialize search and lookup utilities
-        self.pubmed_searcher = PubMedSearcher()
-        self.pmid_lookup = PMIDEntityLookup()
+        # Search and lookup utilities are created on first use, so single-phase runs only set up what they need
+        self.ncbi_api_key = ncbi_api_key
+    
+    @cached_property
+    def pubmed_searcher(self) -> PubMedSearcher:
+        """PubMed searcher used by Phase 2."""
+        # Phase 2 saves the whole search cache to disk, so it must not evict loaded or new searches
+        return PubMedSearcher(api_key=self.ncbi_api_key, cache_size=None)
+    
+    @cached_property
+    def pmid_lookup(self) -> PMIDEntityLookup:
+        """Dataset PMID lookup used by Phase 3."""
+        return PMIDEntityLookup()
+    
+    def _load_missing_entities(self, coverage_file: Path, id_col: str, entity_type: str) -> List[Dict]:
+        """Load the entities from a MEDI comparison CSV that are absent from every dataset."""
+        if not coverage_file.exists():
+            logger.warning(f"{entity_type.capitalize()} coverage file not found: {coverage_file}")
+            return []
+        
+        logger.info(f"Processing {coverage_file}")
+        missing = []
+        
+        # Explicit dtypes skip per-chunk type inference
+        dtypes = {id_col: str, 'label': str}
+        dtypes.update(dict.fromkeys(PRESENCE_COLUMNS, bool))
+        
+        # Filter chunk by chunk so only the (few) missing rows outlive each read
+        for chunk in pd.read_csv(coverage_file, usecols=[id_col, 'label'] + PRESENCE_COLUMNS,
+                                 dtype=dtypes, chunksize=COVERAGE_CHUNK_SIZE):
+            # Find entities where all renormalized presence columns are False; the bool columns share
+            # one block, so this is a single OR-reduction across each row
+            missing_mask = ~chunk[PRESENCE_COLUMNS].to_numpy(dtype=bool).any(axis=1)
+            
+            missing_ids = chunk[id_col].to_numpy()[missing_mask]
+            missing_labels = chunk['label'].to_numpy()[missing_mask]
+            missing.extend({id_col: entity_id, 'label': label} for entity_id, label in zip(missing_ids, missing_labels))
+        
+        logger.info(f"Found {len(missing)} completely missing {entity_type}")
+        return missing
     
     def extract_missing_entities(self):
         """Extract drugs and diseases that are completely missing from all datasets."""
         logger.info("Extracting completely missing entities from coverage results")
         
-        # Process drugs
-        drugs_file = Path("analysis_results/medi_inspection/medi_drugs_robokop_comparison.csv")
-        if drugs_file.exists():
-            logger.info(f"Processing {drugs_file}")
-            drugs_df = pd.read_csv(drugs_file)
-            
-            # Find drugs where all renormalized presence columns are False
-            missing_mask = (
-                (drugs_df['ngd_renorm_present'] == False) & 
-                (drugs_df['pubtator_renorm_present'] == False) & 
-                (drugs_df['omnicorp_renorm_present'] == False)
-            )
-            
-            missing_drugs_df = drugs_df[missing_mask]
-            self.missing_drugs = missing_drugs_df[['drug_id', 'label']].to_dict('records')
-            
-            logger.info(f"Found {len(self.missing_drugs)} completely missing drugs")
-        else:
-            logger.warning(f"Drugs coverage file not found: {drugs_file}")
-        
-        # Process diseases
-        diseases_file = Path("analysis_results/medi_inspection/medi_diseases_robokop_comparison.csv")
-        if diseases_file.exists():
-            logger.info(f"Processing {diseases_file}")
-            diseases_df = pd.read_csv(diseases_file)
-            
-            # Find diseases where all renormalized presence columns are False
-            missing_mask = (
-                (diseases_df['ngd_renorm_present'] == False) & 
-                (diseases_df['pubtator_renorm_present'] == False) & 
-                (diseases_df['omnicorp_renorm_present'] == False)
-            )
-            
-            missing_diseases_df = diseases_df[missing_mask]
-            self.missing_diseases = missing_diseases_df[['disease_id', 'label']].to_dict('records')
-            
-            logger.info(f"Found {len(self.missing_diseases)} completely missing diseases")
-        else:
-            logger.warning(f"Diseases coverage file not found: {diseases_file}")
+        coverage_dir = Path("analysis_results/medi_inspection")
+        self.missing_drugs = self._load_missing_entities(
+            coverage_dir / "medi_drugs_robokop_comparison.csv", 'drug_id', 'drugs')
+        self.missing_diseases = self._load_missing_entities(
+            coverage_dir / "medi_diseases_robokop_comparison.csv", 'disease_id', 'diseases')
     
     def save_missing_entities_summary(self):
         """Save summary of missing entities for review."""
         logger.info("Saving missing entities summary")
         
+        num_drugs = len(self.missing_drugs)
+        num_diseases = len(self.missing_diseases)
+        
         # Save missing drugs
         if self.missing_drugs:
             drugs_df = pd.DataFrame(self.missing_drugs)
             drugs_output = self.output_dir / 'missing_drugs.csv'
             drugs_df.to_csv(drugs_output, index=False)
-            logger.info(f"Saved {len(self.missing_drugs)} missing drugs to {drugs_output}")
+            logger.info(f"Saved {num_drugs} missing drugs to {drugs_output}")
         
         # Save missing diseases
         if self.missing_diseases:
             diseases_df = pd.DataFrame(self.missing_diseases)
             diseases_output = self.output_dir / 'missing_diseases.csv'
             diseases_df.to_csv(diseases_output, index=False)
-            logger.info(f"Saved {len(self.missing_diseases)} missing diseases to {diseases_output}")
+            logger.info(f"Saved {num_diseases} missing diseases to {diseases_output}")
         
         # Generate summary report
         summary_lines = [
@@ -110,9 +130,9 @@ class MissingEntityAnalyzer:
             "=" * 80,
             "",
             f"📊 OVERALL STATISTICS:",
-            f"  Missing drugs:    {len(self.missing_drugs):>6}",
-            f"  Missing diseases: {len(self.missing_diseases):>6}",
-            f"  Total missing:    {len(self.missing_drugs) + len(self.missing_diseases):>6}",
+            f"  Missing drugs:    {num_drugs:>6}",
+            f"  Missing diseases: {num_diseases:>6}",
+            f"  Total missing:    {num_drugs + num_diseases:>6}",
             "",
             "🔍 NEXT STEPS:",
             "1. Run PubMed search for these entity labels",
@@ -128,10 +148,9 @@ class MissingEntityAnalyzer:
                 "📋 SAMPLE MISSING DRUGS:",
                 "-" * 40
             ])
-            for i, drug in enumerate(self.missing_drugs[:10]):
-                summary_lines.append(f"  {drug['drug_id']}: {drug['label']}")
-            if len(self.missing_drugs) > 10:
-                summary_lines.append(f"  ... and {len(self.missing_drugs) - 10} more")
+            summary_lines.extend(f"  {drug['drug_id']}: {drug['label']}" for drug in self.missing_drugs[:10])
+            if num_drugs > 10:
+                summary_lines.append(f"  ... and {num_drugs - 10} more")
             summary_lines.append("")
         
         if self.missing_diseases:
@@ -139,23 +158,23 @@ class MissingEntityAnalyzer:
                 "📋 SAMPLE MISSING DISEASES:",
                 "-" * 40
             ])
-            for i, disease in enumerate(self.missing_diseases[:10]):
-                summary_lines.append(f"  {disease['disease_id']}: {disease['label']}")
-            if len(self.missing_diseases) > 10:
-                summary_lines.append(f"  ... and {len(self.missing_diseases) - 10} more")
+            summary_lines.extend(f"  {disease['disease_id']}: {disease['label']}" for disease in self.missing_diseases[:10])
+            if num_diseases > 10:
+                summary_lines.append(f"  ... and {num_diseases - 10} more")
             summary_lines.append("")
         
         summary_lines.append("=" * 80)
+        summary = '\n'.join(summary_lines)
         
         # Write summary
         summary_output = self.output_dir / 'missing_entities_summary.txt'
         with open(summary_output, 'w') as f:
-            f.write('\n'.join(summary_lines))
+            f.write(summary)
         
         logger.info(f"Summary report saved to {summary_output}")
         
         # Print summary to console
-        print('\n'.join(summary_lines))
+        print(summary)
     
     def run_phase_2(self, max_entities_per_type: int = 50):
         """Run Phase 2: Search PubMed for missing entity labels."""
@@ -167,6 +186,15 @@ class MissingEntityAnalyzer:
         
         logger.info(f"Searching PubMed for {len(drugs_to_search)} drugs and {len(diseases_to_search)} diseases")
         
+        # Reuse results from earlier runs so only labels not searched before hit the API
+        search_cache_file = self.output_dir / 'pubmed_search_cache.json'
+        try:
+            with open(search_cache_file) as f:
+                self.pubmed_searcher.search_cache.update(json.load(f))
+            logger.info(f"Loaded {len(self.pubmed_searcher.search_cache)} cached PubMed searches from {search_cache_file}")
+        except FileNotFoundError:
+            pass
+        
         # Search for drugs
         drug_search_results = {}
         if drugs_to_search:
@@ -179,6 +207,12 @@ class MissingEntityAnalyzer:
             logger.info("Searching for missing diseases...")
             disease_search_results = self.pubmed_searcher.batch_search_entities(diseases_to_search)
         
+        # Replace the cache atomically so an interrupted run never leaves it truncated
+        tmp_cache_file = search_cache_file.with_suffix('.json.tmp')
+        with open(tmp_cache_file, 'w') as f:
+            json.dump(self.pubmed_searcher.search_cache, f)
+        os.replace(tmp_cache_file, search_cache_file)
+        
         # Save search results
         search_results = {
             'drugs': drug_search_results,
@@ -186,8 +220,8 @@ class MissingEntityAnalyzer:
             'search_metadata': {
                 'total_drugs_searched': len(drugs_to_search),
                 'total_diseases_searched': len(diseases_to_search),
-                'successful_drug_searches': sum(1 for r in drug_search_results.values() if r['search_successful']),
-                'successful_disease_searches': sum(1 for r in disease_search_results.values() if r['search_successful'])
+                'successful_drug_searches': sum(r['search_successful'] for r in drug_search_results.values()),
+                'successful_disease_searches': sum(r['search_successful'] for r in disease_search_results.values())
             }
         }
         
@@ -200,41 +234,74 @@ class MissingEntityAnalyzer:
         
         return search_results
     
+    def _load_pmid_lookup_cache(self, cache_file: Path) -> Dict[str, Dict[str, List[str]]]:
+        """Load PMID lookups saved by earlier runs, discarding them if any dataset changed since."""
+        try:
+            cache_mtime = cache_file.stat().st_mtime
+        except FileNotFoundError:
+            return {}
+        
+        dataset_files = [paths['jsonl'] for paths in self.pmid_lookup.dataset_paths.values()]
+        if any(path.exists() and path.stat().st_mtime > cache_mtime for path in dataset_files):
+            logger.info(f"Datasets changed since {cache_file} was written; discarding cached PMID lookups")
+            cache_file.unlink()
+            return {}
+        
+        pmid_cache = {}
+        with open(cache_file) as f:
+            for line in f:
+                entry = json.loads(line)
+                pmid_cache[entry['pmid']] = entry['entities']
+        
+        logger.info(f"Loaded {len(pmid_cache)} cached PMID lookups from {cache_file}")
+        return pmid_cache
+    
     def run_phase_3(self, search_results: Dict):
         """Run Phase 3: Cross-reference PMIDs with our dataset contents."""
         logger.info("Starting Phase 3: Cross-reference PMIDs with dataset contents")
         
         # Collect all PMIDs from search results
-        all_pmids = set()
-        
-        for entity_type in ['drugs', 'diseases']:
-            for entity_id, result in search_results[entity_type].items():
-                all_pmids.update(result['pmids'])
-        
-        logger.info(f"Looking up entities for {len(all_pmids)} PMIDs across our datasets")
-        
-        # Look up entities for all PMIDs
-        pmid_entity_results = self.pmid_lookup.batch_lookup_pmids(list(all_pmids))
+        all_pmids = set(chain.from_iterable(
+            result['pmids']
+            for entity_type in ['drugs', 'diseases']
+            for result in search_results[entity_type].values()
+        ))
+        
+        # Only PMIDs not looked up by an earlier run need a dataset scan
+        pmid_cache_file = self.output_dir / 'pmid_lookup_cache.jsonl'
+        pmid_cache = self._load_pmid_lookup_cache(pmid_cache_file)
+        clean_pmids = [pmid.replace("PMID:", "") for pmid in all_pmids]
+        uncached_pmids = [pmid for pmid in clean_pmids if pmid not in pmid_cache]
+        
+        logger.info(f"Looking up entities for {len(all_pmids)} PMIDs across our datasets "
+                    f"({len(clean_pmids) - len(uncached_pmids)} cached)")
+        
+        # Look up entities for the remaining PMIDs and append them to the cache
+        new_results = {}
+        if uncached_pmids:
+            new_results = self.pmid_lookup.batch_lookup_pmids(uncached_pmids)
+            with open(pmid_cache_file, 'a') as f:
+                for pmid, dataset_results in new_results.items():
+                    f.write(json.dumps({'pmid': pmid, 'entities': dataset_results}, default=json_default) + '\n')
+        
+        pmid_entity_results = {
+            pmid: pmid_cache[pmid] if pmid in pmid_cache else new_results[pmid]
+            for pmid in clean_pmids
+        }
         
         # Analyze patterns
         analysis = self.pmid_lookup.analyze_pmid_entity_patterns(pmid_entity_results)
         
-        # Convert sets to lists for JSON serialization
-        serializable_pmid_results = {}
-        for pmid, dataset_results in pmid_entity_results.items():
-            serializable_pmid_results[pmid] = {
-                dataset: list(entities) for dataset, entities in dataset_results.items()
-            }
-        
-        # Save PMID lookup results
+        # Save PMID lookup results; entity sets are serialized directly by json_default
         pmid_results = {
-            'pmid_entities': serializable_pmid_results,
+            'pmid_entities': pmid_entity_results,
             'analysis': analysis
         }
         
+        # Compact output keeps json on its C encoder; this file is read back by --phase 4, not by people
         pmid_output = self.output_dir / 'pmid_entity_lookup_results.json'
         with open(pmid_output, 'w') as f:
-            json.dump(pmid_results, f, indent=2)
+            json.dump(pmid_results, f, separators=(',', ':'), default=json_default)
         
         logger.info(f"PMID entity lookup results saved to {pmid_output}")
         logger.info("Phase 3 complete!")
@@ -251,7 +318,7 @@ class MissingEntityAnalyzer:
         # Save detailed analysis
         analysis_output = self.output_dir / 'gap_analysis_report.json'
         with open(analysis_output, 'w') as f:
-            json.dump(gap_analysis, f, indent=2)
+            json.dump(gap_analysis, f, indent=2, default=json_default)
         
         # Generate human-readable report
         self._generate_readable_report(gap_analysis)
@@ -261,13 +328,17 @@ class MissingEntityAnalyzer:
     
     def _generate_gap_analysis(self, search_results: Dict, pmid_results: Dict) -> Dict:
         """Generate comprehensive gap analysis."""
+        num_drugs = len(self.missing_drugs)
+        num_diseases = len(self.missing_diseases)
+        pmid_entities = pmid_results.get('pmid_entities', {})
+        
         analysis = {
             'summary': {
-                'total_missing_entities': len(self.missing_drugs) + len(self.missing_diseases),
-                'missing_drugs': len(self.missing_drugs),
-                'missing_diseases': len(self.missing_diseases),
+                'total_missing_entities': num_drugs + num_diseases,
+                'missing_drugs': num_drugs,
+                'missing_diseases': num_diseases,
                 'entities_found_in_pubmed': 0,
-                'pmids_analyzed': len(pmid_results.get('pmid_entities', {})),
+                'pmids_analyzed': len(pmid_entities),
                 'entities_found_in_our_data': pmid_results.get('analysis', {}).get('total_entities_found', {})
             },
             'entity_gaps': [],
@@ -275,11 +346,12 @@ class MissingEntityAnalyzer:
             'recommendations': []
         }
         
+        entity_gaps = analysis['entity_gaps']
+        
         # Count entities found in PubMed
         for entity_type in ['drugs', 'diseases']:
             for entity_id, result in search_results[entity_type].items():
                 if result['search_successful']:
-                    analysis['summary']['entities_found_in_pubmed'] += 1
                     
                     # Analyze this specific entity
                     entity_analysis = {
@@ -292,11 +364,13 @@ class MissingEntityAnalyzer:
                     
                     # Check what we found for each PMID
                     for pmid in result['pmids']:
-                        if pmid in pmid_results.get('pmid_entities', {}):
-                            entity_analysis['entities_in_our_data'][pmid] = pmid_results['pmid_entities'][pmid]
+                        entities = pmid_entities.get(pmid)
+                        if entities is not None:
+                            entity_analysis['entities_in_our_data'][pmid] = entities
                     
-                    analysis['entity_gaps'].append(entity_analysis)
+                    entity_gaps.append(entity_analysis)
         
+        analysis['summary']['entities_found_in_pubmed'] = len(entity_gaps)
         return analysis
     
     def _generate_readable_report(self, gap_analysis: Dict):
@@ -319,9 +393,8 @@ class MissingEntityAnalyzer:
         
         # Add findings about what entities we found
         entities_found = gap_analysis['summary']['entities_found_in_our_data']
-        for dataset, count in entities_found.items():
-            if count > 0:
-                report_lines.append(f"  {dataset}: Found {count:,} entities in our data for analyzed PMIDs")
+        report_lines.extend(f"  {dataset}: Found {count:,} entities in our data for analyzed PMIDs"
+                            for dataset, count in entities_found.items() if count > 0)
         
         if not any(entities_found.values()):
             report_lines.append("  ⚠️  No entities found in our datasets for any analyzed PMIDs")
@@ -335,16 +408,17 @@ class MissingEntityAnalyzer:
             "",
             "=" * 80
         ])
+        report = '\n'.join(report_lines)
         
         # Write report
         report_output = self.output_dir / 'gap_analysis_summary.txt'
         with open(report_output, 'w') as f:
-            f.write('\n'.join(report_lines))
+            f.write(report)
         
         logger.info(f"Gap analysis summary saved to {report_output}")
         
         # Print to console
-        print('\n'.join(report_lines))
+        print(report)
     
     def run_phase_1(self):
         """Run Phase 1: Extract completely missing entities."""
@@ -414,6 +488,12 @@ Examples:
         help="Run only a specific phase (1=extract, 2=pubmed, 3=lookup, 4=report)"
     )
     
+    parser.add_argument(
+        "--ncbi-api-key",
+        default=os.environ.get("NCBI_API_KEY"),
+        help="NCBI API key (default: $NCBI_API_KEY); raises the PubMed rate limit from 3 to 10 requests/second"
+    )
+    
     parser.add_argument(
         "--verbose", "-v",
         action="store_true",
@@ -428,7 +508,7 @@ Examples:
     else:
         logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(message)s')
     
-    analyzer = MissingEntityAnalyzer()
+    analyzer = MissingEntityAnalyzer(ncbi_api_key=args.ncbi_api_key)
     
     if args.phase:
         # Run individual phase
@@ -441,8 +521,8 @@ Examples:
             print("Running Phase 2: PubMed search...")
             analyzer.extract_missing_entities()  # Reload entities
             search_results = analyzer.run_phase_2(args.max_entities)
-            successful_searches = sum(1 for r in search_results['drugs'].values() if r['search_successful'])
-            successful_searches += sum(1 for r in search_results['diseases'].values() if r['search_successful'])
+            search_metadata = search_results['search_metadata']
+            successful_searches = search_metadata['successful_drug_searches'] + search_metadata['successful_disease_searches']
             print(f"✓ Completed PubMed searches: {successful_searches} successful")
             
         elif args.phase == 3:
@@ -469,7 +549,7 @@ Examples:
         print(f"Total entities to process: {args.max_entities * 2}")
         print("This will take approximately:")
         print(f"  - Phase 1: < 1 second")
-        print(f"  - Phase 2: ~{args.max_entities * 2 * 0.5 / 60:.1f} minutes (PubMed API)")
+        print(f"  - Phase 2: ~{args.max_entities * 2 * analyzer.pubmed_searcher.rate_limit_delay / 60:.1f} minutes (PubMed API)")
         print(f"  - Phase 3: ~2-3 minutes (dataset lookup)")
         print(f"  - Phase 4: < 1 second")
         print()
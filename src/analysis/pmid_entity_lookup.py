@@ -9,21 +9,184 @@ might be missing from our data.
 
 import json
 import logging
+import mmap
+import os
+import re
 import sqlite3
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import compress
 from pathlib import Path
-from typing import Dict, List, Set, Optional
-from collections import defaultdict
+from typing import Dict, FrozenSet, Iterator, List, Set, Optional, Tuple
+from collections import OrderedDict, defaultdict
+
+try:
+    from .pmid_index_builder import (PMID_INDEX_DIR, load_pmid_index, lookup_pmid_index,
+                                     pmid_index_contains, pmid_index_files)
+except ImportError:
+    # Running as script directly
+    from pmid_index_builder import (PMID_INDEX_DIR, load_pmid_index, lookup_pmid_index,
+                                    pmid_index_contains, pmid_index_files)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Records start at column 0, so raw_decode can parse each line without the strip
+# and whitespace handling that json.loads adds
+JSONL_DECODER = json.JSONDecoder()
+
+# Beyond about 200 targets the prefilter regex costs as much per line as parsing the JSON
+PREFILTER_MAX_TARGETS = 200
+
+
+def build_pmid_prefilter(target_pmids: FrozenSet[str]) -> re.Pattern:
+    """
+    Build a regex matching any quoted target PMID, e.g. "PMID:12345".
+    
+    The PMID numbers are factored into a character trie so each match attempt
+    costs the length of a PMID rather than the number of targets.
+    
+    Args:
+        target_pmids: Set of PMIDs to match (with PMID: prefix)
+        
+    Returns:
+        Compiled bytes pattern for searching the raw JSONL file
+    """
+    trie = {}
+    for pmid in target_pmids:
+        node = trie
+        # The closing quote ends every key, so no key is a prefix of another
+        for char in pmid.replace("PMID:", "") + '"':
+            node = node.setdefault(char, {})
+    
+    def to_pattern(node: Dict) -> str:
+        branches = [re.escape(char) + to_pattern(child) for char, child in sorted(node.items())]
+        if len(branches) <= 1:
+            return ''.join(branches)
+        return '(?:' + '|'.join(branches) + ')'
+    
+    return re.compile(('"PMID:' + to_pattern(trie)).encode())
+
+
+def iter_numbered_lines(jsonl_path: Path) -> Iterator[Tuple[int, str]]:
+    """Yield (line number, line) for every line of a file."""
+    with open(jsonl_path, 'r') as f:
+        yield from enumerate(f, 1)
+
+
+def iter_matching_lines(jsonl_path: Path, pattern: re.Pattern) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (byte offset, line) for each line of a file that matches a bytes pattern.
+    
+    The pattern is searched across the memory-mapped file rather than line by line,
+    so lines without a match are never split out or decoded.
+    """
+    with open(jsonl_path, 'rb') as f:
+        # mmap cannot map an empty file
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            
+            position = 0
+            while match := pattern.search(mm, position):
+                start = mm.rfind(b'\n', 0, match.start()) + 1
+                end = mm.find(b'\n', match.end())
+                if end == -1:
+                    end = len(mm)
+                
+                yield start, mm[start:end].decode()
+                position = end + 1
+
+
+def scan_dataset_for_pmids(dataset_name: str, jsonl_path: Path,
+                           target_pmids: FrozenSet[str]) -> Dict[str, Set[str]]:
+    """
+    Scan a single dataset for all target PMIDs in one pass.
+    
+    Module-level so batch_lookup_pmids can run it in a worker process.
+    
+    Args:
+        dataset_name: Name of dataset to scan
+        jsonl_path: Path to the dataset's cleaned JSONL file
+        target_pmids: Set of PMIDs to look for (with PMID: prefix)
+        
+    Returns:
+        Dictionary mapping PMID to set of entities found
+    """
+    if not jsonl_path.exists():
+        raise FileNotFoundError(f"Required JSONL file not found for {dataset_name}: {jsonl_path}")
+    
+    # Nothing can match, and with no targets the prefilter would match every quoted PMID
+    if not target_pmids:
+        return {}
+    
+    pmid_to_entities = defaultdict(set)
+    entities_found = 0
+    lines_processed = 0
+    # Bound once here rather than looked up on every line
+    decode = JSONL_DECODER.raw_decode
+    
+    # Most lines mention none of the targets when the target set is small, so search the
+    # file for them directly and only parse the lines that match
+    if len(target_pmids) <= PREFILTER_MAX_TARGETS:
+        lines = iter_matching_lines(jsonl_path, build_pmid_prefilter(target_pmids))
+        location = "at byte {}"
+    else:
+        lines = iter_numbered_lines(jsonl_path)
+        location = "on line {}"
+    
+    try:
+        for position, line in lines:
+            lines_processed += 1
+            
+            # Progress logging for large files
+            if lines_processed % 100000 == 0:
+                logger.info(f"  {dataset_name}: Parsed {lines_processed:,} lines, found {entities_found} entity matches")
+            
+            try:
+                record = decode(line)[0]
+                publications = record.get('publications', [])
+                curie = record.get('curie')
+                
+                if not curie:
+                    continue
+                
+                # Check if any target PMIDs are in this record's publications, probing the
+                # target set with each PMID rather than building a set per record
+                if target_pmids.isdisjoint(publications):
+                    continue
+                
+                for pmid in target_pmids.intersection(publications):
+                    pmid_to_entities[pmid].add(curie)
+                    entities_found += 1
+                    
+            except json.JSONDecodeError:
+                logger.warning(f"Invalid JSON {location.format(position)} in {dataset_name}")
+            except KeyError as e:
+                logger.warning(f"Missing key {e} {location.format(position)} in {dataset_name}")
+    
+    except Exception as e:
+        logger.error(f"Error scanning {dataset_name} for PMIDs: {e}")
+        return {}
+    
+    logger.info(f"  {dataset_name}: Found {entities_found} entity matches across {len(pmid_to_entities)} PMIDs")
+    return dict(pmid_to_entities)
+
 
 class PMIDEntityLookup:
     """Look up entities in our datasets by PMID."""
     
-    def __init__(self):
-        """Initialize with paths to our cleaned datasets."""
+    def __init__(self, cache_size: int = 50_000):
+        """
+        Initialize with paths to our cleaned datasets.
+        
+        Args:
+            cache_size: Maximum number of (dataset, PMID) lookups kept in the cache
+        """
         self.dataset_paths = {
             'NGD': {
                 'jsonl': Path('cleaned/ngd/ngd_cleaned.jsonl'),
@@ -39,8 +202,13 @@ class PMIDEntityLookup:
             }
         }
         
-        # Cache for PMID->entities mappings
-        self.pmid_cache = {}
+        # Memory-mapped PMID indexes from pmid_index_builder.py, loaded on first use
+        self.index_dir = PMID_INDEX_DIR
+        self.pmid_indexes = {}
+        
+        # Cache for PMID->entities mappings, least recently used first
+        self.cache_size = cache_size
+        self.pmid_cache = OrderedDict()
     
     def lookup_entities_for_pmid_sqlite(self, dataset_name: str, pmid: str) -> Set[str]:
         """
@@ -48,7 +216,7 @@ class PMIDEntityLookup:
         
         Args:
             dataset_name: Name of dataset (NGD, PubTator, OmniCorp)
-            pmid: PMID to look up (without PMID: prefix)
+            pmid: PMID to look up, with or without the PMID: prefix
             
         Returns:
             Set of CURIEs found for this PMID
@@ -58,25 +226,24 @@ class PMIDEntityLookup:
         if not sqlite_path.exists():
             raise FileNotFoundError(f"Required SQLite file not found for {dataset_name}: {sqlite_path}")
         
+        conn = sqlite3.connect(sqlite_path)
         try:
-            conn = sqlite3.connect(sqlite_path)
             cursor = conn.cursor()
             
-            # Query for entities containing this PMID
-            # The publications column contains JSON array of PMIDs
-            cursor.execute("""
-                SELECT curie FROM curie_to_pmids 
-                WHERE publications LIKE ?
-            """, (f'%"PMID:{pmid}"%',))
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pmid_to_curie'"
+            )
+            if not cursor.fetchone():
+                raise ValueError(f"{sqlite_path} has no pmid_to_curie table; rebuild it with jsonl_to_sqlite.py")
             
-            entities = {row[0] for row in cursor.fetchall()}
+            # Indexed PMID -> CURIE table (built by jsonl_to_sqlite.py)
+            cursor.execute(
+                "SELECT curie FROM pmid_to_curie WHERE pmid = ?",
+                (int(pmid.removeprefix('PMID:')),)
+            )
+            return {row[0] for row in cursor.fetchall()}
+        finally:
             conn.close()
-            
-            return entities
-            
-        except Exception as e:
-            logger.error(f"Error querying {dataset_name} SQLite for PMID {pmid}: {e}")
-            return set()
     
     def lookup_entities_for_pmid_jsonl(self, dataset_name: str, pmid: str) -> Set[str]:
         """
@@ -117,9 +284,47 @@ class PMIDEntityLookup:
         
         return entities
     
+    def lookup_entities_for_pmid_index(self, dataset_name: str, pmid: str) -> Set[str]:
+        """
+        Look up entities for a PMID in the prebuilt index (see pmid_index_builder.py).
+        
+        Args:
+            dataset_name: Name of dataset (NGD, PubTator, OmniCorp)
+            pmid: PMID to look up (without PMID: prefix)
+            
+        Returns:
+            Set of CURIEs found for this PMID
+        """
+        return set(lookup_pmid_index(self._load_pmid_index(dataset_name), pmid))
+    
+    def _load_pmid_index(self, dataset_name: str) -> Dict[str, np.ndarray]:
+        """Memory-map a dataset's PMID index on first use."""
+        if dataset_name not in self.pmid_indexes:
+            try:
+                self.pmid_indexes[dataset_name] = load_pmid_index(self.index_dir, dataset_name)
+            except FileNotFoundError as e:
+                raise FileNotFoundError(f"Required PMID index not found for {dataset_name}: {e.filename}") from e
+        
+        return self.pmid_indexes[dataset_name]
+    
+    def _current_pmid_index(self, dataset_name: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Return a dataset's PMID index if it was built after the JSONL file last changed.
+        
+        Lookups are answered from it when it is current; a stale or missing index
+        falls back to reading the JSONL file.
+        """
+        keys_file = pmid_index_files(self.index_dir, dataset_name)['keys']
+        try:
+            if keys_file.stat().st_mtime < self.dataset_paths[dataset_name]['jsonl'].stat().st_mtime:
+                return None
+            return self._load_pmid_index(dataset_name)
+        except FileNotFoundError:
+            return None
+    
     def lookup_entities_for_pmid(self, dataset_name: str, pmid: str) -> Set[str]:
         """
-        Look up entities for a PMID using JSONL files (more reliable than SQLite for this use case).
+        Look up entities for a PMID from the dataset's PMID index, or its JSONL file if the index is not current.
         
         Args:
             dataset_name: Name of dataset (NGD, PubTator, OmniCorp)
@@ -134,13 +339,19 @@ class PMIDEntityLookup:
         # Check cache first
         cache_key = f"{dataset_name}:{clean_pmid}"
         if cache_key in self.pmid_cache:
+            self.pmid_cache.move_to_end(cache_key)
             return self.pmid_cache[cache_key]
         
-        # Use JSONL files for reliable searching
-        entities = self.lookup_entities_for_pmid_jsonl(dataset_name, clean_pmid)
+        # The index holds every PMID -> CURIE mapping in the JSONL file it was built from
+        if self._current_pmid_index(dataset_name) is not None:
+            entities = self.lookup_entities_for_pmid_index(dataset_name, clean_pmid)
+        else:
+            entities = self.lookup_entities_for_pmid_jsonl(dataset_name, clean_pmid)
         
-        # Cache results
+        # Cache results, evicting the least recently used beyond cache_size
         self.pmid_cache[cache_key] = entities
+        while len(self.pmid_cache) > self.cache_size:
+            self.pmid_cache.popitem(last=False)
         
         return entities
     
@@ -166,7 +377,8 @@ class PMIDEntityLookup:
         """
         Look up entities for multiple PMIDs across all datasets efficiently.
         
-        Scans each dataset file once, collecting all target PMIDs in a single pass.
+        Datasets with a current PMID index are answered from the index; the rest are
+        scanned once each, collecting all target PMIDs in a single pass.
         Much more efficient than looking up PMIDs individually.
         
         Args:
@@ -179,82 +391,43 @@ class PMIDEntityLookup:
         
         # Clean PMIDs and create target set
         clean_pmids = [pmid.replace("PMID:", "") for pmid in pmids]
-        target_pmids = {f"PMID:{pmid}" for pmid in clean_pmids}
+        target_pmids = frozenset(f"PMID:{pmid}" for pmid in clean_pmids)
         
         # Initialize results structure
         results = {pmid: {dataset: set() for dataset in self.dataset_paths.keys()} 
                   for pmid in clean_pmids}
         
-        # Scan each dataset once
-        for dataset_name in self.dataset_paths.keys():
-            logger.info(f"Scanning {dataset_name} for {len(target_pmids)} target PMIDs")
-            dataset_results = self._scan_dataset_for_pmids(dataset_name, target_pmids)
+        # Scan each dataset without a current index once, all concurrently in separate processes
+        with ProcessPoolExecutor(max_workers=len(self.dataset_paths)) as executor:
+            futures = {}
+            for dataset_name, paths in self.dataset_paths.items():
+                pmid_index = self._current_pmid_index(dataset_name)
+                if pmid_index is not None:
+                    # Collect each target PMID's entities straight from the index
+                    unique_pmids = list(dict.fromkeys(clean_pmids))
+                    present = pmid_index_contains(pmid_index, unique_pmids)
+                    for clean_pmid in compress(unique_pmids, present):
+                        results[clean_pmid][dataset_name] = set(lookup_pmid_index(pmid_index, clean_pmid))
+                    logger.info(f"Found {int(present.sum())} target PMIDs in the {dataset_name} PMID index")
+                    continue
+                
+                logger.info(f"Scanning {dataset_name} for {len(target_pmids)} target PMIDs")
+                future = executor.submit(scan_dataset_for_pmids, dataset_name, paths['jsonl'], target_pmids)
+                futures[future] = dataset_name
             
-            # Merge results
-            for pmid, entities in dataset_results.items():
-                clean_pmid = pmid.replace("PMID:", "")
-                if clean_pmid in results:
-                    results[clean_pmid][dataset_name] = entities
+            for future in as_completed(futures):
+                dataset_name = futures[future]
+                dataset_results = future.result()
+                
+                # Merge results
+                for pmid, entities in dataset_results.items():
+                    clean_pmid = pmid.replace("PMID:", "")
+                    if clean_pmid in results:
+                        results[clean_pmid][dataset_name] = entities
         
         logger.info(f"Batch lookup complete for {len(results)} PMIDs")
         return results
     
-    def _scan_dataset_for_pmids(self, dataset_name: str, target_pmids: Set[str]) -> Dict[str, Set[str]]:
-        """
-        Scan a single dataset for all target PMIDs in one pass.
-        
-        Args:
-            dataset_name: Name of dataset to scan
-            target_pmids: Set of PMIDs to look for (with PMID: prefix)
-            
-        Returns:
-            Dictionary mapping PMID to set of entities found
-        """
-        jsonl_path = self.dataset_paths[dataset_name]['jsonl']
-        
-        if not jsonl_path.exists():
-            raise FileNotFoundError(f"Required JSONL file not found for {dataset_name}: {jsonl_path}")
-        
-        pmid_to_entities = defaultdict(set)
-        entities_found = 0
-        lines_processed = 0
-        
-        try:
-            with open(jsonl_path, 'r') as f:
-                for line_num, line in enumerate(f, 1):
-                    lines_processed += 1
-                    
-                    try:
-                        record = json.loads(line.strip())
-                        publications = record.get('publications', [])
-                        curie = record.get('curie')
-                        
-                        if not curie:
-                            continue
-                        
-                        # Check if any target PMIDs are in this record's publications
-                        matching_pmids = target_pmids.intersection(set(publications))
-                        
-                        for pmid in matching_pmids:
-                            pmid_to_entities[pmid].add(curie)
-                            entities_found += 1
-                            
-                    except json.JSONDecodeError:
-                        logger.warning(f"Invalid JSON on line {line_num} in {dataset_name}")
-                    except KeyError as e:
-                        logger.warning(f"Missing key {e} on line {line_num} in {dataset_name}")
-                    
-                    # Progress logging for large files
-                    if lines_processed % 100000 == 0:
-                        logger.info(f"  {dataset_name}: Processed {lines_processed:,} lines, found {entities_found} entity matches")
-        
-        except Exception as e:
-            logger.error(f"Error scanning {dataset_name} for PMIDs: {e}")
-            return {}
-        
-        logger.info(f"  {dataset_name}: Found {entities_found} entity matches across {len(pmid_to_entities)} PMIDs")
-        return dict(pmid_to_entities)
-    
     def analyze_pmid_entity_patterns(self, pmid_results: Dict[str, Dict[str, Set[str]]]) -> Dict:
         """
         Analyze patterns in PMID entity lookup results.
@@ -284,7 +457,9 @@ class PMIDEntityLookup:
                     
                     # Analyze by prefix
                     for entity in entities:
-                        prefix = entity.split(':', 1)[0] if ':' in entity else 'NO_PREFIX'
+                        prefix, sep, _ = entity.partition(':')
+                        if not sep:
+                            prefix = 'NO_PREFIX'
                         analysis['entities_by_prefix'][dataset][prefix] += 1
         
         # Convert sets to lists for JSON serialization
@@ -7,62 +7,197 @@ for fast lookup during missing entity analysis.
 """
 
 import json
-import pickle
 import logging
+import os
+import numpy as np
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, Set
+from typing import Dict, List, Optional, Tuple
 from collections import defaultdict
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Records start at column 0, so raw_decode can parse each line without the strip
+# and whitespace handling that json.loads adds
+JSONL_DECODER = json.JSONDecoder()
 
-def build_pmid_index_for_dataset(dataset_name: str, jsonl_path: Path) -> Dict[str, Set[str]]:
+# Relative to the repository root, like the cleaned dataset paths
+PMID_INDEX_DIR = Path('analysis_results/pmid_indexes')
+
+READ_BUFFER_SIZE = 8 << 20
+# Files smaller than this per worker are not worth splitting across processes
+MIN_PARSE_CHUNK_SIZE = 64 << 20
+
+
+def build_pmid_index_chunk(dataset_name: str, jsonl_path: Path, start: int,
+                           end: int) -> Tuple[List[str], Dict[str, array]]:
     """
-    Build a reverse PMID index for a dataset.
+    Build a partial PMID index from the JSONL lines that begin within the byte range [start, end).
     
-    Args:
-        dataset_name: Name of the dataset
-        jsonl_path: Path to the cleaned JSONL file
-        
     Returns:
-        Dictionary mapping PMID -> set of CURIEs
+        The chunk's CURIEs, and a mapping of PMID -> positions of its CURIEs in that list
     """
-    logger.info(f"Building PMID index for {dataset_name} from {jsonl_path}")
-    
-    if not jsonl_path.exists():
-        logger.warning(f"JSONL file not found: {jsonl_path}")
-        return {}
-    
-    pmid_index = defaultdict(set)
-    
-    with open(jsonl_path, 'r') as f:
-        for line_num, line in enumerate(f, 1):
-            if line_num % 1000000 == 0:
-                logger.info(f"  Processed {line_num:,} records from {dataset_name}")
+    curie_ids = {}
+    pmid_index = defaultdict(lambda: array('I'))
+    records_processed = 0
+    decode = JSONL_DECODER.raw_decode
+    
+    with open(jsonl_path, 'rb', buffering=READ_BUFFER_SIZE) as f:
+        # Skip the partial line owned by the previous chunk (a line starting exactly at start is kept)
+        if start:
+            f.seek(start - 1)
+            f.readline()
+        offset = f.tell()
+        
+        while offset < end:
+            line = f.readline()
+            if not line:
+                break
+            line_offset = offset
+            offset += len(line)
+            
+            records_processed += 1
+            if records_processed % 1000000 == 0:
+                logger.info(f"  Processed {records_processed:,} records from {dataset_name} bytes {start:,}-{end:,}")
             
             try:
-                record = json.loads(line.strip())
+                record = decode(line.decode())[0]
                 curie = record['curie']
                 publications = record.get('publications', [])
                 
-                # Add this CURIE to each PMID's set
+                # Store each CURIE once and refer to it by a 32-bit id from every PMID
+                curie_id = curie_ids.setdefault(curie, len(curie_ids))
                 for pub in publications:
                     # Remove PMID: prefix to get just the number
                     pmid = pub.replace("PMID:", "")
-                    pmid_index[pmid].add(curie)
+                    pmid_index[pmid].append(curie_id)
                     
             except json.JSONDecodeError:
-                logger.warning(f"Invalid JSON on line {line_num} in {dataset_name}")
+                logger.warning(f"Invalid JSON at byte {line_offset:,} in {dataset_name}")
             except KeyError as e:
-                logger.warning(f"Missing key {e} on line {line_num} in {dataset_name}")
+                logger.warning(f"Missing key {e} at byte {line_offset:,} in {dataset_name}")
+    
+    return list(curie_ids), dict(pmid_index)
+
+
+def build_pmid_index_for_dataset(dataset_name: str, jsonl_path: Path,
+                                 num_chunks: Optional[int] = None) -> Tuple[List[str], Dict[str, array]]:
+    """
+    Build a reverse PMID index for a dataset.
+    
+    Args:
+        dataset_name: Name of the dataset
+        jsonl_path: Path to the cleaned JSONL file
+        num_chunks: Number of byte ranges to parse in parallel (defaults to one per CPU for large files)
+        
+    Returns:
+        The dataset's CURIEs, and a dictionary mapping PMID -> array of positions
+        in that list (a CURIE may be listed more than once for a PMID)
+    """
+    logger.info(f"Building PMID index for {dataset_name} from {jsonl_path}")
     
-    # Convert defaultdict to regular dict with sets converted to lists for JSON serialization
-    pmid_index = {pmid: list(curies) for pmid, curies in pmid_index.items()}
+    if not jsonl_path.exists():
+        logger.warning(f"JSONL file not found: {jsonl_path}")
+        return [], {}
+    
+    # Records are newline-delimited, so the file splits cleanly into byte ranges parsed in parallel
+    file_size = jsonl_path.stat().st_size
+    if num_chunks is None:
+        num_chunks = max(1, min(os.cpu_count() or 1, file_size // MIN_PARSE_CHUNK_SIZE))
+    boundaries = [file_size * i // num_chunks for i in range(num_chunks + 1)]
+    
+    if num_chunks == 1:
+        curies, pmid_index = build_pmid_index_chunk(dataset_name, jsonl_path, 0, file_size)
+    else:
+        logger.info(f"  Parsing {file_size:,} bytes in {num_chunks} parallel chunks")
+        curie_ids = {}
+        pmid_index = defaultdict(lambda: array('I'))
+        with ProcessPoolExecutor(max_workers=num_chunks) as executor:
+            chunk_indexes = executor.map(build_pmid_index_chunk, repeat(dataset_name), repeat(jsonl_path),
+                                         boundaries[:-1], boundaries[1:])
+            for chunk_curies, chunk_index in chunk_indexes:
+                # Translate the chunk's CURIE ids into the dataset-wide numbering
+                remap = [curie_ids.setdefault(curie, len(curie_ids)) for curie in chunk_curies]
+                for pmid, ids in chunk_index.items():
+                    pmid_index[pmid].extend([remap[i] for i in ids])
+                logger.info(f"  Merged {len(pmid_index):,} PMIDs so far from {dataset_name}")
+        
+        curies, pmid_index = list(curie_ids), dict(pmid_index)
     
-    logger.info(f"Built index for {dataset_name}: {len(pmid_index):,} PMIDs")
-    return pmid_index
+    logger.info(f"Built index for {dataset_name}: {len(pmid_index):,} PMIDs, {len(curies):,} CURIEs")
+    return curies, pmid_index
+
+
+def pmid_index_files(index_dir: Path, dataset_name: str) -> Dict[str, Path]:
+    """Paths of the arrays making up a dataset's saved PMID index."""
+    return {part: index_dir / f'{dataset_name.lower()}_pmid_index_{part}.npy'
+            for part in ('keys', 'offsets', 'curie_ids', 'curies')}
+
+
+def save_pmid_index(curies: List[str], pmid_index: Dict[str, array], index_dir: Path, dataset_name: str):
+    """
+    Save a PMID index as sorted arrays that can be memory-mapped at lookup time.
+    
+    The CURIEs of the i-th sorted PMID are curies[curie_ids[offsets[i]:offsets[i + 1]]];
+    PMIDs and CURIEs are stored as UTF-8 bytes and CURIE ids as uint32.
+    
+    Args:
+        curies: The dataset's CURIEs, indexed by CURIE id
+        pmid_index: Dictionary mapping PMID -> array of CURIE ids
+        index_dir: Directory to write the arrays to
+        dataset_name: Name of the dataset
+    """
+    files = pmid_index_files(index_dir, dataset_name)
+    pmids = sorted(pmid_index)
+    
+    lengths = np.fromiter((len(pmid_index[pmid]) for pmid in pmids), dtype=np.int64, count=len(pmids))
+    curie_ids = np.frombuffer(b''.join(pmid_index[pmid].tobytes() for pmid in pmids), dtype=np.uint32)
+    pmid_positions = np.repeat(np.arange(len(pmids)), lengths)
+    
+    # Sort each PMID's CURIE ids and drop repeats, all PMIDs at once
+    order = np.lexsort((curie_ids, pmid_positions))
+    pmid_positions, curie_ids = pmid_positions[order], curie_ids[order]
+    keep = np.ones(len(curie_ids), dtype=bool)
+    keep[1:] = (pmid_positions[1:] != pmid_positions[:-1]) | (curie_ids[1:] != curie_ids[:-1])
+    
+    offsets = np.zeros(len(pmids) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(pmid_positions[keep], minlength=len(pmids)))
+    
+    np.save(files['keys'], np.array([pmid.encode() for pmid in pmids], dtype=bytes))
+    np.save(files['offsets'], offsets)
+    np.save(files['curie_ids'], curie_ids[keep])
+    np.save(files['curies'], np.array([curie.encode() for curie in curies], dtype=bytes))
+
+
+def load_pmid_index(index_dir: Path, dataset_name: str) -> Dict[str, np.ndarray]:
+    """Memory-map a dataset's saved PMID index; nothing is read until it is searched."""
+    return {part: np.load(path, mmap_mode='r') for part, path in pmid_index_files(index_dir, dataset_name).items()}
+
+
+def pmid_index_contains(pmid_index: Dict[str, np.ndarray], pmids: List[str]) -> np.ndarray:
+    """Return a boolean mask of which PMIDs (without PMID: prefix) have entries in a loaded index."""
+    keys = pmid_index['keys']
+    values = np.array([pmid.encode() for pmid in pmids], dtype=bytes)
+    positions = np.searchsorted(keys, values)
+    found = positions < len(keys)
+    found[found] = keys[positions[found]] == values[found]
+    return found
+
+
+def lookup_pmid_index(pmid_index: Dict[str, np.ndarray], pmid: str) -> List[str]:
+    """Return the CURIEs for a PMID (without PMID: prefix) from a loaded index."""
+    keys = pmid_index['keys']
+    key = pmid.encode()
+    position = int(np.searchsorted(keys, key))
+    if position == len(keys) or keys[position] != key:
+        return []
+    
+    start, end = pmid_index['offsets'][position:position + 2]
+    return [curie.decode() for curie in pmid_index['curies'][pmid_index['curie_ids'][start:end]]]
 
 
 def build_all_pmid_indexes():
@@ -75,7 +210,7 @@ def build_all_pmid_indexes():
         'OmniCorp': Path('cleaned/omnicorp/omnicorp_cleaned.jsonl')
     }
     
-    output_dir = Path('../../analysis_results/pmid_indexes')
+    output_dir = PMID_INDEX_DIR
     output_dir.mkdir(parents=True, exist_ok=True)
     
     all_indexes = {}
@@ -83,22 +218,13 @@ def build_all_pmid_indexes():
     for dataset_name, jsonl_path in datasets.items():
         logger.info(f"\n=== Building index for {dataset_name} ===")
         
-        pmid_index = build_pmid_index_for_dataset(dataset_name, jsonl_path)
+        curies, pmid_index = build_pmid_index_for_dataset(dataset_name, jsonl_path)
         all_indexes[dataset_name] = pmid_index
         
         # Save individual index
-        index_output = output_dir / f'{dataset_name.lower()}_pmid_index.pkl'
-        with open(index_output, 'wb') as f:
-            pickle.dump(pmid_index, f)
+        save_pmid_index(curies, pmid_index, output_dir, dataset_name)
         
-        logger.info(f"Saved {dataset_name} PMID index to {index_output}")
-    
-    # Save combined index
-    combined_output = output_dir / 'all_pmid_indexes.pkl'
-    with open(combined_output, 'wb') as f:
-        pickle.dump(all_indexes, f)
-    
-    logger.info(f"Saved combined PMID indexes to {combined_output}")
+        logger.info(f"Saved {dataset_name} PMID index to {output_dir}")
     
     # Generate summary
     logger.info("\n" + "="*60)
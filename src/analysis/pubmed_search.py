@@ -7,8 +7,12 @@ and retrieve relevant PMIDs to understand why certain drugs/diseases
 might be missing from our datasets.
 """
 
+import re
 import time
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Optional
 from Bio import Entrez
 import requests
@@ -21,19 +25,50 @@ logger = logging.getLogger(__name__)
 # Set email for Entrez (required by NCBI)
 Entrez.email = "research@example.com"  # Replace with actual email in production
 
+# Chemical notation blanked out of long labels, and characters that require quoting a term
+CHEMICAL_NOTATION_TABLE = str.maketrans({char: " " for char in "()[],"})
+SPECIAL_CHARACTERS = re.compile(r"[:;()\[\]]")
+
 
 class PubMedSearcher:
     """Search PubMed for entity labels and retrieve relevant PMIDs."""
     
-    def __init__(self, rate_limit_delay: float = 0.5):
+    def __init__(self, rate_limit_delay: Optional[float] = None, api_key: Optional[str] = None,
+                 max_workers: int = 4, cache_size: Optional[int] = 20_000):
         """
         Initialize PubMed searcher.
         
         Args:
-            rate_limit_delay: Delay between API calls to respect NCBI rate limits
+            rate_limit_delay: Minimum delay between API call starts to respect NCBI rate limits
+                (defaults to 0.5s, or 0.1s when an API key is given)
+            api_key: NCBI API key, which raises the allowed rate from 3 to 10 requests/second
+            max_workers: Number of searches allowed in flight at once during batch searches
+            cache_size: Maximum number of searches kept in the cache, or None to keep every search
         """
+        if api_key:
+            Entrez.api_key = api_key
+        if rate_limit_delay is None:
+            rate_limit_delay = 0.1 if api_key else 0.5
+        
         self.rate_limit_delay = rate_limit_delay
-        self.search_cache = {}  # Cache to avoid repeated searches
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self.search_cache = OrderedDict()  # Cache to avoid repeated searches, least recently used first
+        self._cache_lock = threading.Lock()
+        
+        # Request start times are spaced out across all worker threads
+        self._rate_limit_lock = threading.Lock()
+        self._next_request_time = 0.0
+    
+    def _wait_for_rate_limit(self):
+        """Block until this thread may issue the next API call."""
+        with self._rate_limit_lock:
+            now = time.monotonic()
+            request_time = max(now, self._next_request_time)
+            self._next_request_time = request_time + self.rate_limit_delay
+        
+        if request_time > now:
+            time.sleep(request_time - now)
     
     def search_pubmed_for_entity(self, entity_label: str, max_results: int = 5) -> List[str]:
         """
@@ -48,9 +83,11 @@ class PubMedSearcher:
         """
         # Check cache first
         cache_key = f"{entity_label}:{max_results}"
-        if cache_key in self.search_cache:
-            logger.debug(f"Using cached results for: {entity_label}")
-            return self.search_cache[cache_key]
+        with self._cache_lock:
+            if cache_key in self.search_cache:
+                logger.debug(f"Using cached results for: {entity_label}")
+                self.search_cache.move_to_end(cache_key)
+                return self.search_cache[cache_key]
         
         logger.info(f"Searching PubMed for: {entity_label}")
         
@@ -58,6 +95,9 @@ class PubMedSearcher:
             # Clean up the search term
             search_term = self._prepare_search_term(entity_label)
             
+            # Rate limiting
+            self._wait_for_rate_limit()
+            
             # Search PubMed
             handle = Entrez.esearch(
                 db="pubmed",
@@ -72,14 +112,14 @@ class PubMedSearcher:
             
             pmids = search_results.get("IdList", [])
             
-            # Cache results
-            self.search_cache[cache_key] = pmids
+            # Cache results, evicting the least recently used beyond cache_size
+            with self._cache_lock:
+                self.search_cache[cache_key] = pmids
+                while self.cache_size is not None and len(self.search_cache) > self.cache_size:
+                    self.search_cache.popitem(last=False)
             
             logger.info(f"Found {len(pmids)} PMIDs for '{entity_label}'")
             
-            # Rate limiting
-            time.sleep(self.rate_limit_delay)
-            
             return pmids
             
         except Exception as e:
@@ -103,16 +143,14 @@ class PubMedSearcher:
         if len(cleaned) > 100:
             # For long chemical names, try to extract meaningful parts
             # Remove common chemical notation
-            cleaned = cleaned.replace("(", " ").replace(")", " ")
-            cleaned = cleaned.replace("[", " ").replace("]", " ")
-            cleaned = cleaned.replace(",", " ")
+            cleaned = cleaned.translate(CHEMICAL_NOTATION_TABLE)
             
             # Take first few meaningful words
             words = [w for w in cleaned.split() if len(w) > 3][:5]
             cleaned = " ".join(words)
         
         # Quote the term if it contains special characters
-        if any(char in cleaned for char in [':', ';', '(', ')', '[', ']']):
+        if SPECIAL_CHARACTERS.search(cleaned):
             cleaned = f'"{cleaned}"'
         
         return cleaned
@@ -133,23 +171,38 @@ class PubMedSearcher:
         results = {}
         total_entities = len(entities)
         
-        for i, entity in enumerate(entities, 1):
-            entity_id = entity.get('drug_id') or entity.get('disease_id') or entity.get('id', 'unknown')
-            entity_label = entity.get('drug_label') or entity.get('disease_label') or entity.get('label', 'unknown')
-            
-            logger.info(f"Processing entity {i}/{total_entities}: {entity_id}")
-            
-            pmids = self.search_pubmed_for_entity(entity_label, max_results)
+        entity_ids = [entity.get('drug_id') or entity.get('disease_id') or entity.get('id', 'unknown')
+                      for entity in entities]
+        entity_labels = [entity.get('drug_label') or entity.get('disease_label') or entity.get('label', 'unknown')
+                         for entity in entities]
+        
+        # Entities sharing a label (synonyms) need only one search between them
+        unique_labels = list(dict.fromkeys(entity_labels))
+        if len(unique_labels) < total_entities:
+            logger.info(f"Searching {len(unique_labels)} unique labels for {total_entities} entities")
+        
+        # Searches are network-bound, so keep several in flight; the shared rate limiter
+        # still spaces out request starts
+        pmids_by_label = {}
+        total_labels = len(unique_labels)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.search_pubmed_for_entity, label, max_results): label
+                       for label in unique_labels}
+            for i, future in enumerate(as_completed(futures), 1):
+                pmids_by_label[futures[future]] = future.result()
+                
+                # Progress logging as searches finish
+                if i % 10 == 0:
+                    logger.info(f"Completed {i}/{total_labels} searches")
+        
+        for entity_id, entity_label in zip(entity_ids, entity_labels):
+            pmids = pmids_by_label[entity_label]
             
             results[entity_id] = {
                 'label': entity_label,
                 'pmids': pmids,
                 'search_successful': len(pmids) > 0
             }
-            
-            # Progress logging
-            if i % 10 == 0:
-                logger.info(f"Completed {i}/{total_entities} entities")
         
         logger.info(f"Batch search complete. Processed {len(results)} entities")
         return results
@@ -7,6 +7,7 @@ This script:
 2. Converts it back to the same SQLite format as the original input
 3. Creates a table with same structure: curie_to_pmids (curie TEXT, pmids TEXT)
 4. Formats PMIDs as Python list strings (same as input format)
+5. Adds an indexed pmid_to_curie (pmid INTEGER, curie TEXT) table for PMID lookups
 """
 
 import sqlite3
@@ -30,15 +31,23 @@ def convert_jsonl_to_sqlite(jsonl_file: str, sqlite_file: str):
     
     logger.info(f"Converting {jsonl_path} to {sqlite_path}")
     
-    # Create SQLite database
+    # Create SQLite database, rebuilding from scratch so a failed earlier build is never reused
+    if sqlite_path.exists():
+        sqlite_path.unlink()
     conn = sqlite3.connect(sqlite_path)
     cursor = conn.cursor()
     
+    # A crash mid-build leaves a partial file that the next run deletes, so skip journaling
+    cursor.execute("PRAGMA journal_mode=OFF")
+    cursor.execute("PRAGMA synchronous=OFF")
+    
     # Create table with same structure as input
-    cursor.execute("DROP TABLE IF EXISTS curie_to_pmids")
     cursor.execute("CREATE TABLE curie_to_pmids (curie TEXT, pmids TEXT)")
     cursor.execute("CREATE UNIQUE INDEX unique_curie ON curie_to_pmids (curie)")
     
+    # Reverse mapping so entities can be looked up by PMID without scanning curie_to_pmids
+    cursor.execute("CREATE TABLE pmid_to_curie (pmid INTEGER, curie TEXT)")
+    
     # Process JSONL file
     records_processed = 0
     records_written = 0
@@ -76,6 +85,8 @@ def convert_jsonl_to_sqlite(jsonl_file: str, sqlite_file: str):
                 # Insert into database
                 cursor.execute("INSERT INTO curie_to_pmids (curie, pmids) VALUES (?, ?)", 
                              (curie, pmids_str))
+                cursor.executemany("INSERT INTO pmid_to_curie (pmid, curie) VALUES (?, ?)",
+                                   ((pmid, curie) for pmid in pmids))
                 records_written += 1
                 
             except json.JSONDecodeError as e:
@@ -85,6 +96,10 @@ def convert_jsonl_to_sqlite(jsonl_file: str, sqlite_file: str):
             except Exception as e:
                 logger.error(f"Unexpected error on line {line_num}: {e}")
     
+    # Index after the bulk insert, which is much faster than maintaining it row by row
+    logger.info("Indexing pmid_to_curie")
+    cursor.execute("CREATE INDEX idx_pmid ON pmid_to_curie (pmid)")
+    
     # Commit and close
     conn.commit()
     conn.close()
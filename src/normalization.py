@@ -79,6 +79,12 @@ class CurieNormalizer:
         
         # Track biolink classes from normalization
         self.normalized_biolink_classes = {}
+        
+        # Options sent with every request; they change which identifier a CURIE normalizes to
+        self.normalization_options = {
+            "conflate": True,
+            "drug_chemical_conflate": True
+        }
     
     def normalize_curies(self, curies: List[str], pmid_data: Dict[str, List[int]]) -> Dict[str, str]:
         """Normalize a batch of CURIEs using the node normalizer API with robust retry logic."""
@@ -86,8 +92,7 @@ class CurieNormalizer:
         
         payload = {
             "curies": curies,
-            "conflate": True,
-            "drug_chemical_conflate": True
+            **self.normalization_options
         }
         
         try:
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Tests for counting failed normalizations by prefix."""
+
+import pytest
+import os
+import csv
+import tempfile
+import shutil
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src" / "analysis"))
+
+from failed_normalizations import analyze_failed_file, analyze_all_datasets, write_detailed_csv_report
+
+
+class TestAnalyzeFailedFile:
+    """Test prefix counting of a single failed normalizations file."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.failed_file = Path(self.temp_dir) / "failed_normalizations.txt"
+    
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        if Path(self.temp_dir).exists():
+            shutil.rmtree(self.temp_dir)
+    
+    def _write_lines(self, lines):
+        """Write raw lines to the failed normalizations file."""
+        with open(self.failed_file, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+    
+    def test_prefix_counts(self):
+        """Test counting CURIEs by the text before their first colon."""
+        self._write_lines([
+            "MESH:D014867",
+            "MESH:C000123",
+            "CHEBI:15377",
+            "UMLS:C0000005:extra",
+            "MESH:D000068877",
+        ])
+        
+        assert analyze_failed_file(self.failed_file) == {"MESH": 3, "CHEBI": 1, "UMLS": 1}
+    
+    def test_blank_and_whitespace_lines_skipped(self):
+        """Test that empty and whitespace-only lines are not counted."""
+        self._write_lines([
+            "",
+            "MESH:D014867",
+            "   ",
+            "\t",
+            "  CHEBI:15377  ",
+            "",
+        ])
+        
+        assert analyze_failed_file(self.failed_file) == {"MESH": 1, "CHEBI": 1}
+    
+    def test_no_colon_rows(self):
+        """Test that CURIEs without a colon are counted under NO_PREFIX."""
+        self._write_lines([
+            "water",
+            "NA",
+            "null",
+            "MESH:D014867",
+        ])
+        
+        assert analyze_failed_file(self.failed_file) == {"NO_PREFIX": 3, "MESH": 1}
+    
+    def test_quotes_are_literal(self):
+        """Test that quote characters are kept as part of the CURIE rather than parsed."""
+        self._write_lines([
+            '"MESH:D014867"',
+            'CHEBI:"15377',
+            '"unbalanced',
+            "MESH:D000068877",
+            "CHEBI:15377",
+        ])
+        
+        assert analyze_failed_file(self.failed_file) == {'"MESH': 1, "CHEBI": 2, "NO_PREFIX": 1, "MESH": 1}
+    
+    def test_delimiter_like_characters(self):
+        """Test that commas and tabs inside a line do not split it into several CURIEs."""
+        self._write_lines([
+            "MESH:D1,MESH:D2",
+            "CHEBI:1\tCHEBI:2",
+        ])
+        
+        assert analyze_failed_file(self.failed_file) == {"MESH": 1, "CHEBI": 1}
+    
+    def test_empty_file(self):
+        """Test that an empty file has no failures."""
+        self.failed_file.touch()
+        
+        assert analyze_failed_file(self.failed_file) == {}
+    
+    def test_blank_lines_only(self):
+        """Test that a file holding only blank lines has no failures."""
+        self._write_lines(["", "", ""])
+        
+        assert analyze_failed_file(self.failed_file) == {}
+    
+    def test_missing_file(self):
+        """Test that a missing file has no failures."""
+        assert analyze_failed_file(Path(self.temp_dir) / "missing.txt") == {}
+
+
+class TestAnalyzeAllDatasets:
+    """Test analyzing every dataset's failed normalizations in parallel."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        # Dataset paths are relative to src/analysis, two levels below the repository root
+        self.original_cwd = os.getcwd()
+        self.temp_dir = tempfile.mkdtemp()
+        working_dir = Path(self.temp_dir) / "src" / "analysis"
+        working_dir.mkdir(parents=True)
+        os.chdir(working_dir)
+        
+        self.failed_lines = {
+            'ngd': ["MESH:D014867", "MESH:C000123", "water"],
+            'pubtator': ["CHEBI:15377", "", "MESH:D014867"],
+        }
+        for dataset, lines in self.failed_lines.items():
+            dataset_dir = Path(self.temp_dir) / "cleaned" / dataset
+            dataset_dir.mkdir(parents=True)
+            with open(dataset_dir / f"{dataset}_failed_normalizations.txt", 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+    
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        os.chdir(self.original_cwd)
+        if Path(self.temp_dir).exists():
+            shutil.rmtree(self.temp_dir)
+    
+    def test_results_by_dataset(self):
+        """Test that each dataset's file is analyzed and a missing file gives no failures."""
+        results = analyze_all_datasets()
+        
+        assert results == {
+            'NGD': {"MESH": 2, "NO_PREFIX": 1},
+            'PubTator': {"CHEBI": 1, "MESH": 1},
+            'OmniCorp': {},
+        }
+    
+    def test_detailed_csv_report(self):
+        """Test the per-prefix CSV report built from the dataset results."""
+        output_path = Path(self.temp_dir) / "failed_normalizations_by_prefix.csv"
+        
+        write_detailed_csv_report(analyze_all_datasets(), output_path)
+        
+        with open(output_path, newline='') as f:
+            rows = list(csv.reader(f))
+        
+        assert rows == [
+            ['Prefix', 'NGD', 'PubTator', 'OmniCorp', 'Total'],
+            ['CHEBI', '0', '1', '0', '1'],
+            ['MESH', '2', '1', '0', '3'],
+            ['NO_PREFIX', '1', '0', '0', '1'],
+        ]
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""Tests for identifier overlap analysis across NGD, PubTator, and OmniCorp."""
+
+import pytest
+import os
+import csv
+import json
+import pickle
+import logging
+import tempfile
+import shutil
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src" / "analysis"))
+
+from identifier_overlap import IdentifierOverlapAnalyzer
+
+
+DATASET_CURIES = {
+    'ngd': ["A:1", "A:2", "B:1", "noprefix", "X:9", "E:1"],
+    'pubtator': ["A:1", "B:1", "C:1", "A:2", "A:2"],
+    'omnicorp': ["A:1", "C:1", "D:1", "A:3", "E:1"],
+}
+
+EXPECTED_OVERLAPS = {
+    'all_three': {"A:1"},
+    'ngd_pubtator_only': {"A:2", "B:1"},
+    'ngd_omnicorp_only': {"E:1"},
+    'pubtator_omnicorp_only': {"C:1"},
+    'ngd_only': {"noprefix", "X:9"},
+    'pubtator_only': set(),
+    'omnicorp_only': {"D:1", "A:3"},
+}
+
+
+class TestIdentifierOverlapAnalyzer:
+    """Test overlap categories, breakdowns and the ingest cache on small dataset files."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        # Dataset paths are relative to src/analysis, two levels below the repository root
+        self.original_cwd = os.getcwd()
+        self.temp_dir = Path(tempfile.mkdtemp())
+        working_dir = self.temp_dir / "src" / "analysis"
+        working_dir.mkdir(parents=True)
+        os.chdir(working_dir)
+        
+        for dataset, curies in DATASET_CURIES.items():
+            self._write_dataset(dataset, curies)
+        
+        # NGD wraps its classes in curie_to_classes, PubTator is a flat mapping, OmniCorp has none
+        self._write_json(self.temp_dir / "cleaned" / "ngd" / "ngd_biolink_classes.json", {
+            "total_normalized_curies": 2,
+            "curie_to_classes": {
+                "A:1": ["biolink:ChemicalEntity", "biolink:NamedThing"],
+                "B:1": "biolink:Gene",
+            }
+        })
+        self._write_json(self.temp_dir / "cleaned" / "pubtator" / "pubtator_biolink_classes.json", {
+            "A:1": ["biolink:Drug"],
+            "C:1": ["biolink:Disease"],
+        })
+        
+        self.cache_file = self.temp_dir / "analysis_results" / "identifier_overlap" / "ingest_cache.pkl"
+    
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        os.chdir(self.original_cwd)
+        if self.temp_dir.exists():
+            shutil.rmtree(self.temp_dir)
+    
+    def _write_dataset(self, dataset: str, curies, extra_lines=()):
+        """Write a cleaned JSONL dataset file with one record per CURIE."""
+        dataset_dir = self.temp_dir / "cleaned" / dataset
+        dataset_dir.mkdir(parents=True, exist_ok=True)
+        with open(dataset_dir / f"{dataset}_cleaned.jsonl", 'w') as f:
+            for i, curie in enumerate(curies):
+                f.write(json.dumps({"curie": curie, "publications": [f"PMID:{i}"]}) + '\n')
+            for line in extra_lines:
+                f.write(line + '\n')
+    
+    def _write_json(self, path: Path, data):
+        """Write a JSON file."""
+        with open(path, 'w') as f:
+            json.dump(data, f)
+    
+    def _analyze(self) -> IdentifierOverlapAnalyzer:
+        """Run the overlap computation with a fresh analyzer."""
+        analyzer = IdentifierOverlapAnalyzer()
+        analyzer.analyze_overlaps()
+        return analyzer
+    
+    def _overlap_curies(self, analyzer: IdentifierOverlapAnalyzer):
+        """Resolve each overlap category to its set of CURIEs."""
+        return {category: set(analyzer.resolve_curies(curie_ids))
+                for category, curie_ids in analyzer.overlaps.items()}
+    
+    def test_overlap_categories(self):
+        """Test that every CURIE lands in the category matching the datasets it appears in."""
+        analyzer = self._analyze()
+        
+        assert self._overlap_curies(analyzer) == EXPECTED_OVERLAPS
+    
+    def test_identifier_counts(self):
+        """Test that each dataset counts a repeated CURIE once and skips unparseable lines."""
+        self._write_dataset('pubtator', DATASET_CURIES['pubtator'],
+                            extra_lines=['{"curie": "BROKEN', '{"publications": []}'])
+        
+        analyzer = self._analyze()
+        
+        assert analyzer.identifier_counts == {'NGD': 6, 'PubTator': 4, 'OmniCorp': 5}
+        assert "BROKEN" not in analyzer.curies
+    
+    def test_missing_dataset_file(self):
+        """Test that a missing dataset contributes no identifiers."""
+        (self.temp_dir / "cleaned" / "omnicorp" / "omnicorp_cleaned.jsonl").unlink()
+        
+        analyzer = self._analyze()
+        overlaps = self._overlap_curies(analyzer)
+        
+        assert analyzer.identifier_counts['OmniCorp'] == 0
+        assert overlaps['ngd_pubtator_only'] == {"A:1", "A:2", "B:1"}
+        assert overlaps['ngd_only'] == {"noprefix", "X:9", "E:1"}
+        assert overlaps['pubtator_only'] == {"C:1"}
+        assert overlaps['omnicorp_only'] == set()
+    
+    def test_prefix_breakdown(self):
+        """Test prefix counts per category, with colon-less CURIEs under NO_PREFIX."""
+        analyzer = self._analyze()
+        
+        prefix_data, _ = analyzer.analyze_breakdowns()
+        
+        assert prefix_data == {
+            'all_three': {"A": 1},
+            'ngd_pubtator_only': {"A": 1, "B": 1},
+            'ngd_omnicorp_only': {"E": 1},
+            'pubtator_omnicorp_only': {"C": 1},
+            'ngd_only': {"NO_PREFIX": 1, "X": 1},
+            'pubtator_only': {},
+            'omnicorp_only': {"A": 1, "D": 1},
+        }
+        assert [list(prefix_counts) for prefix_counts in prefix_data.values()] == \
+            [sorted(prefix_counts) for prefix_counts in prefix_data.values()]
+    
+    def test_biolink_breakdown(self):
+        """Test biolink type counts merged across datasets, with unclassified CURIEs as Unknown."""
+        analyzer = self._analyze()
+        
+        _, biolink_data = analyzer.analyze_breakdowns()
+        
+        assert biolink_data == {
+            'all_three': {"biolink:ChemicalEntity": 1, "biolink:NamedThing": 1, "biolink:Drug": 1},
+            'ngd_pubtator_only': {"biolink:Gene": 1, "Unknown": 1},
+            'ngd_omnicorp_only': {"Unknown": 1},
+            'pubtator_omnicorp_only': {"biolink:Disease": 1},
+            'ngd_only': {"Unknown": 2},
+            'pubtator_only': {},
+            'omnicorp_only': {"Unknown": 2},
+        }
+    
+    def test_detailed_reports(self):
+        """Test the overlap summary, prefix and biolink CSV reports and the sample files."""
+        analyzer = self._analyze()
+        output_dir = self.temp_dir / "reports"
+        
+        analyzer.generate_detailed_reports(output_dir)
+        
+        with open(output_dir / 'overlap_summary.csv', newline='') as f:
+            summary = list(csv.reader(f))
+        assert summary[0] == ['Category', 'Count']
+        assert summary[1:] == [
+            ['All_Three', '1'], ['NGD_PubTator_Only', '2'], ['NGD_OmniCorp_Only', '1'],
+            ['PubTator_OmniCorp_Only', '1'], ['NGD_Only', '2'], ['PubTator_Only', '0'], ['OmniCorp_Only', '2'],
+        ]
+        
+        with open(output_dir / 'overlap_by_prefix.csv', newline='') as f:
+            prefix_rows = list(csv.reader(f))
+        assert prefix_rows[0] == ['Overlap_Type', 'Prefix', 'Count']
+        assert ['ngd_only', 'NO_PREFIX', '1'] in prefix_rows
+        assert len(prefix_rows) == 1 + 9
+        
+        with open(output_dir / 'overlap_by_biolink_type.csv', newline='') as f:
+            biolink_rows = list(csv.reader(f))
+        assert ['all_three', 'biolink:Drug', '1'] in biolink_rows
+        assert len(biolink_rows) == 1 + 9
+        
+        for category, curies in EXPECTED_OVERLAPS.items():
+            sample_file = output_dir / f'sample_identifiers_{category}.txt'
+            assert set(sample_file.read_text().split()) == curies
+    
+    def test_ingest_cache_hit(self, caplog):
+        """Test that a rerun on unchanged files loads the ingest cache and gives the same overlaps."""
+        first = self._analyze()
+        assert self.cache_file.exists()
+        
+        with caplog.at_level(logging.INFO):
+            second = self._analyze()
+        
+        assert "Loading cached identifier ingest" in caplog.text
+        assert self._overlap_curies(second) == self._overlap_curies(first)
+        assert second.identifier_counts == first.identifier_counts
+        assert second.analyze_breakdowns() == first.analyze_breakdowns()
+    
+    def test_ingest_cache_miss_after_dataset_change(self, caplog):
+        """Test that changing a dataset file re-ingests and overwrites the single cache file."""
+        self._analyze()
+        
+        self._write_dataset('pubtator', DATASET_CURIES['pubtator'] + ["D:1", "F:1"])
+        cache_stat = self.cache_file.stat()
+        os.utime(self.temp_dir / "cleaned" / "pubtator" / "pubtator_cleaned.jsonl",
+                 (cache_stat.st_mtime + 10, cache_stat.st_mtime + 10))
+        
+        with caplog.at_level(logging.INFO):
+            analyzer = self._analyze()
+        overlaps = self._overlap_curies(analyzer)
+        
+        assert "re-ingesting" in caplog.text
+        assert "Loading cached identifier ingest" not in caplog.text
+        assert overlaps['pubtator_omnicorp_only'] == {"C:1", "D:1"}
+        assert overlaps['pubtator_only'] == {"F:1"}
+        assert analyzer.identifier_counts['PubTator'] == 6
+        assert list(self.cache_file.parent.glob('*.pkl')) == [self.cache_file]
+    
+    def test_ingest_cache_missing_fields(self, caplog):
+        """Test that a cache written without the current fields is re-ingested rather than loaded."""
+        self._analyze()
+        with open(self.cache_file, 'rb') as f:
+            state = pickle.load(f)
+        del state['identifier_counts']
+        with open(self.cache_file, 'wb') as f:
+            pickle.dump(state, f)
+        
+        with caplog.at_level(logging.INFO):
+            analyzer = self._analyze()
+        
+        assert "older version" in caplog.text
+        assert analyzer.identifier_counts == {'NGD': 6, 'PubTator': 4, 'OmniCorp': 5}
+        assert self._overlap_curies(analyzer) == EXPECTED_OVERLAPS
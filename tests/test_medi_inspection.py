@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Tests for loading RoboKOP node identifiers in MEDI inspection."""
+
+import pytest
+import json
+import tempfile
+import shutil
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src" / "analysis"))
+
+from medi_inspection import load_node_ids_chunk, load_normalized_nodes
+
+
+TEST_NODES = [
+    {"id": "MONDO:0004976", "name": "amyotrophic lateral sclerosis", "category": ["biolink:Disease"]},
+    {"id": "CHEBI:15377", "name": "water", "equivalent_identifiers": ["MESH:D014867"]},
+    {"name": "Sjögren syndrome", "id": "MONDO:0010030"},
+    {"attributes": {"id": "NESTED:1", "value": 2}, "id": "NCBIGene:7157"},
+    {"attributes": {"id": "NESTED:2"}},
+    {"id": "CHEBI:15377", "name": "water (duplicate)"},
+    {"id": "HP:0000001", "name": "Ünïcödé ∂ name"},
+]
+
+EXPECTED_NODES = {"MONDO:0004976", "CHEBI:15377", "MONDO:0010030", "NCBIGene:7157", "HP:0000001"}
+
+
+class TestLoadNodeIdsChunk:
+    """Test that splitting a RoboKOP node file into byte ranges finds every node once."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.nodes_path = Path(self.temp_dir) / "nodes.jsonl"
+        
+        with open(self.nodes_path, 'w', encoding='utf-8') as f:
+            for node in TEST_NODES:
+                f.write(json.dumps(node, ensure_ascii=False) + '\n')
+            f.write('{"attributes": {"id": "BROKEN:1"}, "id": \n')
+        self.file_size = self.nodes_path.stat().st_size
+    
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        if Path(self.temp_dir).exists():
+            shutil.rmtree(self.temp_dir)
+    
+    def test_single_chunk(self):
+        """Test that one chunk covering the file finds only top-level ids of valid nodes."""
+        nodes = load_node_ids_chunk(str(self.nodes_path), 0, self.file_size)
+        
+        assert nodes == EXPECTED_NODES
+    
+    def test_every_two_way_split_matches_single_chunk(self):
+        """Test chunk boundaries at every byte, including inside multi-byte characters."""
+        expected = load_node_ids_chunk(str(self.nodes_path), 0, self.file_size)
+        
+        for boundary in range(self.file_size + 1):
+            first = load_node_ids_chunk(str(self.nodes_path), 0, boundary)
+            second = load_node_ids_chunk(str(self.nodes_path), boundary, self.file_size)
+            
+            assert first | second == expected, f"boundary at byte {boundary}"
+            assert not (first & second) - {"CHEBI:15377"}, f"boundary at byte {boundary}"
+    
+    @pytest.mark.parametrize("num_chunks", [3, 4, 7])
+    def test_many_chunks_match_single_chunk(self, num_chunks):
+        """Test that evenly spaced byte ranges together cover the whole file."""
+        boundaries = [self.file_size * i // num_chunks for i in range(num_chunks + 1)]
+        
+        nodes = set()
+        for start, end in zip(boundaries[:-1], boundaries[1:]):
+            nodes |= load_node_ids_chunk(str(self.nodes_path), start, end)
+        
+        assert nodes == load_node_ids_chunk(str(self.nodes_path), 0, self.file_size)
+    
+    def test_load_normalized_nodes_jsonl(self):
+        """Test loading node ids from a whole JSONL node file."""
+        nodes = load_normalized_nodes(str(self.nodes_path))
+        
+        assert nodes == load_node_ids_chunk(str(self.nodes_path), 0, self.file_size)
+    
+    def test_empty_file(self):
+        """Test that an empty node file has no nodes."""
+        empty_path = Path(self.temp_dir) / "empty.jsonl"
+        empty_path.touch()
+        
+        assert load_node_ids_chunk(str(empty_path), 0, 0) == set()
+        assert load_normalized_nodes(str(empty_path)) == set()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Tests for the Phase 3 PMID lookup cache in missing entity analysis."""
+
+import pytest
+import os
+import json
+import tempfile
+import shutil
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src" / "analysis"))
+
+from missing_entity_analysis import MissingEntityAnalyzer
+
+
+class TestPMIDLookupCache:
+    """Test that cached PMID lookups are reused only while the datasets are unchanged."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        # The analyzer writes under paths relative to the working directory
+        self.original_cwd = os.getcwd()
+        self.temp_dir = tempfile.mkdtemp()
+        os.chdir(self.temp_dir)
+        
+        self.analyzer = MissingEntityAnalyzer()
+        self.cache_file = self.analyzer.output_dir / 'pmid_lookup_cache.jsonl'
+        
+        # Point every dataset at a small cleaned JSONL file in the temp directory
+        self.dataset_files = {}
+        for dataset_name, paths in self.analyzer.pmid_lookup.dataset_paths.items():
+            jsonl_path = Path(self.temp_dir) / f"{dataset_name.lower()}_cleaned.jsonl"
+            self._write_records(jsonl_path, [
+                {"curie": f"{dataset_name}:1", "publications": ["PMID:12345", "PMID:67890"]},
+                {"curie": f"{dataset_name}:2", "publications": ["PMID:67890"]},
+            ])
+            paths['jsonl'] = jsonl_path
+            self.dataset_files[dataset_name] = jsonl_path
+        
+        self.search_results = {
+            'drugs': {'DRUG:1': {'label': 'drug', 'pmids': ['12345', '67890']}},
+            'diseases': {'DISEASE:1': {'label': 'disease', 'pmids': ['67890']}}
+        }
+    
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        os.chdir(self.original_cwd)
+        if Path(self.temp_dir).exists():
+            shutil.rmtree(self.temp_dir)
+    
+    def _write_records(self, jsonl_path: Path, records):
+        """Write records as a cleaned JSONL file."""
+        with open(jsonl_path, 'w') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+    
+    def _set_mtime(self, path: Path, mtime: float):
+        """Set a file's modification time explicitly, independent of filesystem timestamp granularity."""
+        os.utime(path, (mtime, mtime))
+    
+    def test_missing_cache(self):
+        """Test that no cache file means no cached lookups."""
+        assert self.analyzer._load_pmid_lookup_cache(self.cache_file) == {}
+    
+    def test_phase_3_writes_cache(self):
+        """Test that Phase 3 records every looked-up PMID in the cache."""
+        self.analyzer.run_phase_3(self.search_results)
+        
+        cache = self.analyzer._load_pmid_lookup_cache(self.cache_file)
+        
+        assert set(cache) == {'12345', '67890'}
+        assert set(cache['67890']['NGD']) == {'NGD:1', 'NGD:2'}
+        assert set(cache['12345']['PubTator']) == {'PubTator:1'}
+    
+    def test_cache_reused_when_datasets_unchanged(self):
+        """Test that a cache newer than every dataset file is loaded and kept."""
+        self.analyzer.run_phase_3(self.search_results)
+        for jsonl_path in self.dataset_files.values():
+            self._set_mtime(jsonl_path, self.cache_file.stat().st_mtime - 10)
+        
+        cache = self.analyzer._load_pmid_lookup_cache(self.cache_file)
+        
+        assert set(cache) == {'12345', '67890'}
+        assert self.cache_file.exists()
+    
+    def test_cache_invalidated_when_dataset_touched(self):
+        """Test that touching a dataset file after the cache was written discards the cache."""
+        self.analyzer.run_phase_3(self.search_results)
+        self._set_mtime(self.dataset_files['OmniCorp'], self.cache_file.stat().st_mtime + 10)
+        
+        assert self.analyzer._load_pmid_lookup_cache(self.cache_file) == {}
+        assert not self.cache_file.exists()
+    
+    def test_phase_3_rescans_changed_dataset(self):
+        """Test that Phase 3 picks up entities added to a dataset after the cache was written."""
+        self.analyzer.run_phase_3(self.search_results)
+        
+        jsonl_path = self.dataset_files['NGD']
+        self._write_records(jsonl_path, [
+            {"curie": "NGD:1", "publications": ["PMID:12345", "PMID:67890"]},
+            {"curie": "NGD:3", "publications": ["PMID:12345"]},
+        ])
+        self._set_mtime(jsonl_path, self.cache_file.stat().st_mtime + 10)
+        
+        pmid_results = self.analyzer.run_phase_3(self.search_results)
+        
+        assert set(pmid_results['pmid_entities']['12345']['NGD']) == {'NGD:1', 'NGD:3'}
+        assert set(pmid_results['pmid_entities']['67890']['NGD']) == {'NGD:1'}
@@ -218,9 +218,8 @@ class TestOmniCorpToSQLiteConverter:
         # Mock the sorting by creating the sorted file manually
         def mock_sort_side_effect(cmd, check=True):
             if cmd[0] == 'sort':
-                # Extract input and output files from command
-                input_file = cmd[2]
-                output_file = cmd[4]  # -o flag
+                # The output file follows the -o flag, after all the input files
+                output_file = cmd[cmd.index('-o') + 1]
                 
                 # Create mock sorted content
                 with open(output_file, 'w') as f:
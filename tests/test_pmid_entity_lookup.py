@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Tests for scanning cleaned JSONL files for PMIDs."""
+
+import pytest
+import json
+import tempfile
+import shutil
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src" / "analysis"))
+
+from pmid_entity_lookup import (
+    PREFILTER_MAX_TARGETS,
+    build_pmid_prefilter,
+    iter_matching_lines,
+    scan_dataset_for_pmids
+)
+
+
+TEST_RECORDS = [
+    {"curie": "MONDO:0004976", "publications": ["PMID:12345", "PMID:67890"]},
+    {"curie": "CHEBI:15377", "publications": ["PMID:1234", "PMID:123456"]},
+    {"curie": "NCBIGene:7157", "publications": []},
+    {"curie": "MESH:D000068877", "publications": ["PMID:67890", "PMID:12345"]},
+    {"curie": "UMLS:C0000005", "publications": ["PMID:99999"]},
+    {"curie": "HP:0000001", "source": "PMID:55555", "publications": ["PMID:11111"]},
+    {"curie": "GO:0008150", "publications": ["PMID:55555", "PMID:12345"]},
+]
+
+
+def full_scan(dataset_name, jsonl_path, target_pmids):
+    """Scan without the prefilter by padding the targets with PMIDs absent from the file."""
+    padding = frozenset(f"PMID:{900000000 + i}" for i in range(PREFILTER_MAX_TARGETS + 1))
+    return scan_dataset_for_pmids(dataset_name, jsonl_path, frozenset(target_pmids) | padding)
+
+
+class TestPrefilteredScan:
+    """Test that the PMID prefilter finds the same entities as parsing every line."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.jsonl_path = Path(self.temp_dir) / "test_cleaned.jsonl"
+        
+        with open(self.jsonl_path, 'w') as f:
+            for record in TEST_RECORDS:
+                f.write(json.dumps(record) + '\n')
+    
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        if Path(self.temp_dir).exists():
+            shutil.rmtree(self.temp_dir)
+    
+    @pytest.mark.parametrize("target_pmids", [
+        {"PMID:12345"},
+        {"PMID:1234"},
+        {"PMID:123", "PMID:1234567"},
+        {"PMID:12345", "PMID:67890", "PMID:99999"},
+        {"PMID:55555"},
+        {"PMID:11111", "PMID:123456", "PMID:404"},
+        set(),
+    ])
+    def test_prefiltered_scan_matches_full_scan(self, target_pmids):
+        """Test prefiltered and full scans on PMIDs sharing prefixes and quoted outside publications."""
+        prefiltered = scan_dataset_for_pmids("Test", self.jsonl_path, frozenset(target_pmids))
+        
+        assert prefiltered == full_scan("Test", self.jsonl_path, target_pmids)
+    
+    def test_scan_results(self):
+        """Test that a prefiltered scan returns every entity citing each target PMID."""
+        results = scan_dataset_for_pmids("Test", self.jsonl_path, frozenset({"PMID:12345", "PMID:55555"}))
+        
+        assert results == {
+            "PMID:12345": {"MONDO:0004976", "MESH:D000068877", "GO:0008150"},
+            "PMID:55555": {"GO:0008150"},
+        }
+    
+    def test_last_line_without_newline(self):
+        """Test that a match on a final line with no trailing newline is still parsed."""
+        with open(self.jsonl_path, 'a') as f:
+            f.write(json.dumps({"curie": "CL:0000000", "publications": ["PMID:77777"]}))
+        
+        prefiltered = scan_dataset_for_pmids("Test", self.jsonl_path, frozenset({"PMID:77777"}))
+        
+        assert prefiltered == {"PMID:77777": {"CL:0000000"}}
+        assert prefiltered == full_scan("Test", self.jsonl_path, {"PMID:77777"})
+    
+    def test_empty_file(self):
+        """Test that an empty dataset file scans to no results."""
+        empty_path = Path(self.temp_dir) / "empty.jsonl"
+        empty_path.touch()
+        
+        assert scan_dataset_for_pmids("Test", empty_path, frozenset({"PMID:12345"})) == {}
+        assert full_scan("Test", empty_path, {"PMID:12345"}) == {}
+    
+    def test_missing_file(self):
+        """Test that scanning a missing dataset file raises an error."""
+        with pytest.raises(FileNotFoundError):
+            scan_dataset_for_pmids("Test", Path(self.temp_dir) / "missing.jsonl", frozenset({"PMID:12345"}))
+    
+    def test_matching_lines_are_whole_lines(self):
+        """Test that each prefilter match yields its complete line and byte offset."""
+        content = self.jsonl_path.read_bytes()
+        
+        matches = list(iter_matching_lines(self.jsonl_path, build_pmid_prefilter(frozenset({"PMID:67890"}))))
+        
+        assert [json.loads(line)["curie"] for _, line in matches] == ["MONDO:0004976", "MESH:D000068877"]
+        for offset, line in matches:
+            assert content[offset:offset + len(line)].decode() == line
+            assert offset == 0 or content[offset - 1:offset] == b'\n'
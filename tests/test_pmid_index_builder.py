@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Tests for building PMID indexes from cleaned JSONL files."""
+
+import pytest
+import json
+import numpy as np
+import tempfile
+import shutil
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src" / "analysis"))
+
+from pmid_index_builder import (
+    build_pmid_index_chunk,
+    build_pmid_index_for_dataset,
+    save_pmid_index,
+    load_pmid_index,
+    pmid_index_contains,
+    lookup_pmid_index,
+    pmid_index_files
+)
+
+
+TEST_RECORDS = [
+    {"curie": "MONDO:0004976", "publications": ["PMID:12345", "PMID:67890"]},
+    {"curie": "CHEBI:15377", "publications": ["PMID:12345", "PMID:11111", "PMID:12345"]},
+    {"curie": "NCBIGene:7157", "publications": []},
+    {"curie": "MESH:D000068877", "publications": ["PMID:67890"]},
+    {"curie": "UMLS:C0000005", "publications": ["PMID:99999", "PMID:11111", "PMID:12345"]},
+    {"curie": "HP:0000001", "publications": ["PMID:123"]},
+]
+
+
+def index_entries(curies, pmid_index):
+    """Resolve an index to PMID -> set of CURIEs, independent of CURIE numbering."""
+    return {pmid: {curies[curie_id] for curie_id in curie_ids} for pmid, curie_ids in pmid_index.items()}
+
+
+def expected_entries(records):
+    """PMID -> set of CURIEs computed directly from the test records."""
+    entries = {}
+    for record in records:
+        for pub in record["publications"]:
+            entries.setdefault(pub.replace("PMID:", ""), set()).add(record["curie"])
+    return entries
+
+
+class TestBuildPMIDIndexChunks:
+    """Test that splitting a JSONL file into byte ranges gives the same index as one pass."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.jsonl_path = Path(self.temp_dir) / "test_cleaned.jsonl"
+        
+        with open(self.jsonl_path, 'w') as f:
+            for record in TEST_RECORDS:
+                f.write(json.dumps(record) + '\n')
+        self.file_size = self.jsonl_path.stat().st_size
+    
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        if Path(self.temp_dir).exists():
+            shutil.rmtree(self.temp_dir)
+    
+    def test_single_chunk_matches_records(self):
+        """Test that one chunk covering the file indexes every PMID."""
+        curies, pmid_index = build_pmid_index_chunk("Test", self.jsonl_path, 0, self.file_size)
+        
+        assert curies == [record["curie"] for record in TEST_RECORDS]
+        assert index_entries(curies, pmid_index) == expected_entries(TEST_RECORDS)
+    
+    def test_every_two_way_split_matches_single_chunk(self):
+        """Test that each line is parsed by exactly one chunk wherever the boundary falls."""
+        expected = expected_entries(TEST_RECORDS)
+        
+        for boundary in range(self.file_size + 1):
+            entries = {}
+            curie_count = 0
+            for start, end in [(0, boundary), (boundary, self.file_size)]:
+                curies, pmid_index = build_pmid_index_chunk("Test", self.jsonl_path, start, end)
+                curie_count += len(curies)
+                for pmid, chunk_curies in index_entries(curies, pmid_index).items():
+                    entries.setdefault(pmid, set()).update(chunk_curies)
+            
+            assert curie_count == len(TEST_RECORDS), f"boundary at byte {boundary}"
+            assert entries == expected, f"boundary at byte {boundary}"
+    
+    def test_boundary_at_line_start(self):
+        """Test that a line starting exactly at a chunk boundary belongs to that chunk."""
+        second_line_start = len(json.dumps(TEST_RECORDS[0])) + 1
+        
+        first_curies, _ = build_pmid_index_chunk("Test", self.jsonl_path, 0, second_line_start)
+        second_curies, _ = build_pmid_index_chunk("Test", self.jsonl_path, second_line_start, self.file_size)
+        
+        assert first_curies == [TEST_RECORDS[0]["curie"]]
+        assert second_curies == [record["curie"] for record in TEST_RECORDS[1:]]
+    
+    @pytest.mark.parametrize("num_chunks", [2, 3, 5])
+    def test_parallel_build_matches_single_chunk(self, num_chunks):
+        """Test that merging parallel chunks renumbers CURIEs into one consistent index."""
+        single_curies, single_index = build_pmid_index_for_dataset("Test", self.jsonl_path, num_chunks=1)
+        curies, pmid_index = build_pmid_index_for_dataset("Test", self.jsonl_path, num_chunks=num_chunks)
+        
+        assert sorted(curies) == sorted(single_curies)
+        assert index_entries(curies, pmid_index) == index_entries(single_curies, single_index)
+        assert {pmid: len(ids) for pmid, ids in pmid_index.items()} == \
+            {pmid: len(ids) for pmid, ids in single_index.items()}
+    
+    def test_invalid_lines_are_skipped(self):
+        """Test that malformed records do not stop the rest of the chunk from being indexed."""
+        with open(self.jsonl_path, 'a') as f:
+            f.write('{"curie": "BROKEN:1", "publications": [\n')
+            f.write('{"publications": ["PMID:55555"]}\n')
+            f.write(json.dumps({"curie": "GO:0008150", "publications": ["PMID:55555"]}) + '\n')
+        
+        curies, pmid_index = build_pmid_index_for_dataset("Test", self.jsonl_path)
+        
+        assert index_entries(curies, pmid_index)["55555"] == {"GO:0008150"}
+        assert "BROKEN:1" not in curies
+    
+    def test_missing_file(self):
+        """Test that a missing dataset file gives an empty index."""
+        curies, pmid_index = build_pmid_index_for_dataset("Test", Path(self.temp_dir) / "missing.jsonl")
+        
+        assert curies == []
+        assert pmid_index == {}
+
+
+class TestSavedPMIDIndex:
+    """Test the memory-mapped sorted array format of saved PMID indexes."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.index_dir = Path(self.temp_dir) / "pmid_indexes"
+        self.index_dir.mkdir()
+        self.jsonl_path = Path(self.temp_dir) / "test_cleaned.jsonl"
+        
+        with open(self.jsonl_path, 'w') as f:
+            for record in TEST_RECORDS:
+                f.write(json.dumps(record) + '\n')
+        
+        curies, pmid_index = build_pmid_index_for_dataset("Test", self.jsonl_path)
+        save_pmid_index(curies, pmid_index, self.index_dir, "Test")
+        self.pmid_index = load_pmid_index(self.index_dir, "Test")
+    
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        if Path(self.temp_dir).exists():
+            shutil.rmtree(self.temp_dir)
+    
+    def test_saved_arrays(self):
+        """Test that keys are sorted, offsets delimit each PMID and CURIE ids are uint32."""
+        expected = expected_entries(TEST_RECORDS)
+        keys = self.pmid_index['keys']
+        offsets = self.pmid_index['offsets']
+        
+        assert all(path.exists() for path in pmid_index_files(self.index_dir, "Test").values())
+        assert [key.decode() for key in keys] == sorted(expected)
+        assert self.pmid_index['curie_ids'].dtype == np.uint32
+        assert offsets[0] == 0
+        assert offsets[-1] == len(self.pmid_index['curie_ids'])
+        assert np.diff(offsets).tolist() == [len(expected[key.decode()]) for key in keys]
+    
+    def test_repeated_curies_are_deduplicated(self):
+        """Test that a CURIE listing a PMID more than once is stored once for it."""
+        curies = lookup_pmid_index(self.pmid_index, "12345")
+        
+        assert len(curies) == len(set(curies))
+        assert set(curies) == {"MONDO:0004976", "CHEBI:15377", "UMLS:C0000005"}
+    
+    def test_lookup_matches_records(self):
+        """Test that every PMID resolves to exactly the CURIEs that cite it."""
+        for pmid, curies in expected_entries(TEST_RECORDS).items():
+            assert set(lookup_pmid_index(self.pmid_index, pmid)) == curies
+    
+    def test_lookup_missing_pmid(self):
+        """Test lookups of PMIDs before, between and after the stored keys."""
+        assert lookup_pmid_index(self.pmid_index, "1") == []
+        assert lookup_pmid_index(self.pmid_index, "1234") == []
+        assert lookup_pmid_index(self.pmid_index, "999999") == []
+    
+    def test_contains(self):
+        """Test the membership mask, including PMIDs that share a prefix with stored keys."""
+        pmids = ["12345", "123", "1234", "67890", "99999", "999999", "0"]
+        
+        mask = pmid_index_contains(self.pmid_index, pmids)
+        
+        assert mask.tolist() == [True, True, False, True, True, False, False]
+    
+    def test_empty_index(self):
+        """Test that an index with no PMIDs can be saved, loaded and searched."""
+        save_pmid_index([], {}, self.index_dir, "Empty")
+        pmid_index = load_pmid_index(self.index_dir, "Empty")
+        
+        assert pmid_index_contains(pmid_index, ["12345"]).tolist() == [False]
+        assert lookup_pmid_index(pmid_index, "12345") == []